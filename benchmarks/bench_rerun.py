@@ -0,0 +1,211 @@
+"""Rerun latency, memory and payload benchmark for both dashboards.
+
+Each history size runs in a fresh subprocess (so peak RSS is per size),
+seeds a throwaway store with synthetic daily P&L and drives the entry
+scripts headlessly through Streamlit's AppTest. Each worker first checks
+that a script rendering the dashboard twice fails on the render guard:
+
+    python benchmarks/bench_rerun.py --sizes 1k,100k,10m
+    python benchmarks/bench_rerun.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_rerun.py --compare benchmarks/baseline.json
+
+``--compare`` exits non-zero when any stage is slower than the baseline by
+more than ``--tolerance`` (and by more than the noise floor).
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+SCRIPTS = {"sci_fi": "sci_fi_dashboard.py", "performance": "performance_dashboard.py.py"}
+DEFAULT_SIZES = "1k,100k,10m"
+HISTORY_YEARS = 20
+SEED_BATCH = 1_000_000
+RUN_TIMEOUT = 900
+NOISE_FLOOR_S = 0.05
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1])
+    return int(float(text[:-1]) * scale) if scale else int(text)
+
+
+# ----------------------------
+# WORKER
+# ----------------------------
+def seed_store(store, rows, seed=0):
+    """Spread ``rows`` entries over the last HISTORY_YEARS years, ending today."""
+    from pnl_dates import to_day
+
+    rng = np.random.default_rng(seed)
+    stop = to_day(date.today()) + 1
+    start = stop - HISTORY_YEARS * 365
+    with store.batch() as batch:
+        for offset in range(0, rows, SEED_BATCH):
+            n = min(SEED_BATCH, rows - offset)
+            days = np.sort(rng.integers(start, stop, n))
+            batch.add_entries(days, np.round(rng.normal(200, 2500, n), 2))
+
+
+def payload_bytes(at):
+    def walk(node):
+        children = getattr(node, "children", None)
+        if children:
+            for child in children.values():
+                yield from walk(child)
+        elif getattr(node, "proto", None) is not None:
+            yield node.proto.ByteSize()
+    return sum(walk(at.main)) + sum(walk(at.sidebar))
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_stage(at, stage, results):
+    start = time.perf_counter()
+    at.run()
+    wall = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"{stage}: {at.exception[0].message}")
+    results.append({"stage": stage, "wall_s": wall, "peak_rss_mb": peak_rss_mb(), "payload_bytes": payload_bytes(at)})
+
+
+def _render_twice():
+    # AppTest script body: the pasted-twice entry script the render guard exists for.
+    from dashboard_core import run
+    run()
+    run()
+
+
+def check_render_guard():
+    """Fail unless a script that renders the dashboard twice raises ``DuplicatePanelError``."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_function(_render_twice, default_timeout=RUN_TIMEOUT)
+    at.run()
+    if not any(e.proto.type.endswith("DuplicatePanelError") for e in at.exception):
+        raise SystemExit("render guard did not reject a second run() in one script")
+
+
+def bench_worker(rows):
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    out = {"rows": rows, "scripts": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["PNL_DB_PATH"] = os.path.join(tmp, "bench.db")
+        from pnl_store import PnLStore
+
+        # Checked before seeding, on the empty store, and not timed.
+        check_render_guard()
+
+        store = PnLStore(os.environ["PNL_DB_PATH"])
+        start = time.perf_counter()
+        seed_store(store, rows)
+        store.close()
+        out["seed_s"] = time.perf_counter() - start
+
+        for name, script in SCRIPTS.items():
+            st.cache_resource.clear()
+            results = []
+            at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=RUN_TIMEOUT)
+            run_stage(at, "cold", results)
+            run_stage(at, "warm", results)
+            at.number_input(key="entry_pnl").set_value(1234.0)
+            at.button(key="entry_add").click()
+            run_stage(at, "add_entry", results)
+            if name == "sci_fi":
+                at.radio(key="chart_span").set_value("All history")
+                run_stage(at, "history", results)
+            out["scripts"][name] = results
+    # Last line of stdout; Streamlit may log above it.
+    print(json.dumps(out))
+
+
+# ----------------------------
+# DRIVER
+# ----------------------------
+def flatten(report):
+    flat = {}
+    for size in report["sizes"]:
+        for script, stages in size["scripts"].items():
+            for result in stages:
+                flat[f"{size['rows']}/{script}/{result['stage']}"] = result
+    return flat
+
+
+def compare(report, baseline, tolerance):
+    current, previous = flatten(report), flatten(baseline)
+    regressions = []
+    for key, result in current.items():
+        before = previous.get(key)
+        if before is None:
+            continue
+        slower = result["wall_s"] - before["wall_s"]
+        if slower > NOISE_FLOOR_S and result["wall_s"] > before["wall_s"] * (1 + tolerance):
+            regressions.append(f"{key}: {before['wall_s']:.3f}s -> {result['wall_s']:.3f}s")
+    return regressions
+
+
+def print_report(report):
+    print(f"{'rows':>10} {'script':<12} {'stage':<10} {'wall_s':>9} {'rss_mb':>9} {'payload_kb':>11}")
+    for size in report["sizes"]:
+        print(f"{size['rows']:>10,} {'(seed)':<12} {'':<10} {size['seed_s']:>9.3f}")
+        for script, stages in size["scripts"].items():
+            for r in stages:
+                print(f"{size['rows']:>10,} {script:<12} {r['stage']:<10} {r['wall_s']:>9.3f} "
+                      f"{r['peak_rss_mb']:>9.1f} {r['payload_bytes'] / 1024:>11.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated row counts, e.g. 1k,100k,10m")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown fraction (default 0.25)")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        bench_worker(args.worker)
+        return 0
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0], "sizes": []}
+    for rows in (parse_size(s) for s in args.sizes.split(",")):
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", str(rows)],
+                              capture_output=True, text=True, cwd=ROOT)
+        if proc.returncode:
+            sys.stderr.write(proc.stderr)
+            return proc.returncode
+        report["sizes"].append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fh:
+            json.dump(report, fh, indent=2)
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(report, json.load(fh), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,858 @@
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import calendar
+import math
+import os
+import time
+from pnl_store import DEFAULT_ACCOUNT, PAGE_SIZE, ConflictError, PnLStore
+from pnl_backend import AccountState
+from pnl_cache import VersionedCache
+from pnl_charts import bar_figure, calendar_figure, fan_figure, lines_figure, pie_figure, series_figure
+from pnl_dates import day_to_date, month_bounds, period_bounds, range_slice, to_day, to_month
+from pnl_import import MODE_CONTRACT_NOTE, MODE_FILLS, MODE_HISTORY, import_file
+from pnl_live import LIVE_SOURCE, SNAPSHOT_INTERVAL, LiveFeed
+from pnl_portfolio import Portfolio, compute_metrics, overview, range_metrics
+from pnl_profiler import RerunProfiler
+from pnl_projection import FAN_QUANTILES, MIN_HISTORY, remaining_sessions, simulate
+from pnl_risk import ROLLING_WINDOWS
+from pnl_rollups import concat_rollups, end_total, rollup_months, summary_frame
+
+# ----------------------------
+# CONSTANTS
+# ----------------------------
+CHART_SPANS = ["This month", "All history"]
+CALENDAR_YEARS = 10
+ENTRY_SORTS = {"Newest first": ("day", True), "Oldest first": ("day", False),
+               "Largest gain": ("pnl", True), "Largest loss": ("pnl", False)}
+ENTRY_SIGNS = {"All": None, "Gains": 1, "Losses": -1}
+RANGE_PERIODS = {"This week": "week", "This month": "month", "This quarter": "quarter",
+                 "Year to date": "ytd", "Fiscal year": "fiscal", "Custom": None}
+CUSTOM_RANGE_DAYS = 30
+IMPORT_MODES = {"Daily history": MODE_HISTORY, "Contract note": MODE_CONTRACT_NOTE, "Fills (trade-level)": MODE_FILLS}
+
+# Colours and font come from .streamlit/config.toml; this adds the HUD styling.
+THEME_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "theme.css")
+# PNL_FAST_START=1 collapses the heavy panels into expanders that build
+# nothing (no queries, figures or pandas) until they are opened.
+FAST_START = os.environ.get("PNL_FAST_START") == "1"
+# An Arrow export (see pnl_arrow.py) to map at start instead of reading
+# every account's full history from SQLite.
+ARROW_PATH = os.environ.get("PNL_ARROW")
+
+
+# ----------------------------
+# SHARED RESOURCES
+# ----------------------------
+@st.cache_resource(show_spinner=False)
+def get_store():
+    store = PnLStore()
+    if ARROW_PATH:
+        # pyarrow is only imported when a snapshot is configured.
+        from pnl_arrow import MappedHistory
+        store.attach_history(MappedHistory(ARROW_PATH))
+    return store
+
+
+@st.cache_resource(show_spinner=False)
+def get_account_state(account):
+    # One per account for every session, built the first time it is opened.
+    return AccountState(get_store(), account)
+
+
+@st.cache_resource(show_spinner=False)
+def get_cache():
+    return VersionedCache()
+
+
+@st.cache_resource(show_spinner=False)
+def get_profiler():
+    return RerunProfiler()
+
+
+@st.cache_resource(show_spinner=False)
+def get_live_feed():
+    # One listener per process, shared by every session; None without PNL_LIVE.
+    return LiveFeed(LIVE_SOURCE).start() if LIVE_SOURCE else None
+
+
+@st.cache_resource(show_spinner=False)
+def get_theme():
+    with open(THEME_PATH, encoding="utf-8") as fh:
+        return f"<style>{fh.read()}</style>"
+
+
+# ----------------------------
+# RENDER GUARD
+# ----------------------------
+class DuplicatePanelError(RuntimeError):
+    pass
+
+
+class RenderGuard:
+    """Records each panel rendered in one script run and rejects a second render.
+
+    One guard serves the app body and every fragment executed in the same
+    run (see ``render_guard``), so a panel rendered from two fragments, or a
+    script that calls ``run`` twice, fails on the first repeated panel. A
+    fragment rerun is a run of its own and starts a fresh guard.
+    """
+
+    def __init__(self, run=None):
+        self.run = run
+        self.rendered = []
+
+    def mark(self, panel):
+        if panel in self.rendered:
+            raise DuplicatePanelError(f"Panel {panel!r} rendered twice in one rerun")
+        self.rendered.append(panel)
+
+
+def render_guard():
+    """The ``RenderGuard`` of the current script run, kept in session state."""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        # Bare mode (no Streamlit runtime): nothing to share with.
+        return RenderGuard()
+    # Streamlit resets the context's cursors to a new dict at the start of
+    # every run (full or fragment), and the guard holding it keeps it alive,
+    # so the identity check cannot be fooled by a reused id.
+    run = ctx.cursors
+    guard = st.session_state.get("render_guard")
+    if guard is None or guard.run is not run:
+        guard = st.session_state.render_guard = RenderGuard(run)
+    return guard
+
+
+# ----------------------------
+# VIEW STATE
+# ----------------------------
+class View:
+    """Per-run state shared by the data pipeline and the panel renderers.
+
+    Every fragment builds its own View, so a fragment rerun gets a fresh
+    date and timings instead of the ones from the app run; the render guard
+    is the one shared by the whole script run.
+    The selected account comes from the sidebar picker's session state.
+
+    The account's in-memory state is only fetched (and, after a write
+    elsewhere, rebuilt) when a panel first asks for it, so the HUD can paint
+    before any history is loaded.
+
+    Cache keys carry the shared data version (cross-account data) or the
+    account's revision, both read from the database: all sessions in the
+    process reuse one build, and a write from any session or process makes
+    the next run rebuild.
+    """
+
+    def __init__(self, scope="app", today=None):
+        self.today = today or datetime.today()
+        self.current_month = to_month(self.today)
+        self.month_start, self.month_stop = month_bounds(self.current_month)
+        _, self.last_day = calendar.monthrange(self.today.year, self.today.month)
+        self.store = get_store()
+        self.cache = get_cache()
+        self.version = self.store.version
+        self.portfolio = self.cache.get(("shared", self.version, "portfolio"), lambda: Portfolio.from_store(self.store))
+        self.account = self.portfolio.account(st.session_state.get("account", DEFAULT_ACCOUNT))
+        self._state = None
+        self.profiler = get_profiler()
+        self.timings = self.profiler.start_run(scope)
+        self.guard = render_guard()
+
+    @property
+    def state(self):
+        if self._state is None:
+            self._state = get_account_state(self.account.id).current(self.account.revision)
+        return self._state
+
+    @property
+    def aggregates(self):
+        return self.state.aggregates
+
+    @property
+    def risk(self):
+        return self.state.risk
+
+    @property
+    def calendar(self):
+        return self.state.calendar
+
+    def finish(self):
+        self.profiler.finish_run(self.timings)
+
+    def cached(self, name, builder, shared=False):
+        label = name[0] if isinstance(name, tuple) else name
+        scope = ("shared", self.version) if shared else (self.account.id, self.account.revision)
+        return self.cache.get(scope + (name, self.current_month),
+                              lambda: self.timings.timed("build:" + label, builder))
+
+    def written(self):
+        """Drop this account's cached builds after a write from this session."""
+        account = self.account.id
+        self.cache.discard(lambda key: key[0] in (account, "shared"))
+
+
+# ----------------------------
+# DATA PROCESSING
+# ----------------------------
+def load_month(view):
+    """This month's aggregate and fill roll-ups; ``None`` roll-ups when it has no fills."""
+    account = view.account.id
+    month_agg = view.aggregates.month(view.current_month)
+    if not month_agg.count:
+        # Fills always roll up into entries, so there is nothing to load.
+        return month_agg, None
+    from pnl_trades import range_rollups
+    fill_rollups = view.cached("fill_rollups", lambda: range_rollups(view.store, view.month_start, view.month_stop, account))
+    return month_agg, fill_rollups
+
+
+def entries_page(view, query):
+    """``(total, EntryArrays)`` for one entries-browser query; see ``entries_query``."""
+    start, stop, sign, min_abs, sort, page = query
+    column, descending = ENTRY_SORTS[sort]
+    return view.store.entries_page(start, stop, view.account.id, ENTRY_SIGNS[sign], min_abs,
+                                   column, descending, (page - 1) * PAGE_SIZE, PAGE_SIZE)
+
+
+def monthly_summary(view):
+    """Checkpointed closed months plus a fresh rollup of the open month's rows."""
+    state = view.state
+    days, pnl = view.store.load_arrays(state.open_from, None, view.account.id)
+    return summary_frame(concat_rollups(state.rollups, rollup_months(days, pnl, end_total(state.rollups))))
+
+
+def month_total(view):
+    """Month-to-date P&L, from memory when the account state is current, else one indexed SUM."""
+    state = get_account_state(view.account.id)
+    if state.revision is not None and state.revision >= view.account.revision:
+        return state.aggregates.month(view.current_month).total
+    return view.store.total(view.month_start, view.month_stop, view.account.id)
+
+
+def range_bounds(view, period):
+    """``[start, stop)`` days of a ``RANGE_PERIODS`` choice; custom spans come from ``range_custom``."""
+    if RANGE_PERIODS[period]:
+        return period_bounds(RANGE_PERIODS[period], view.today)
+    dates = st.session_state.get("range_custom") or (view.today,)
+    return to_day(dates[0]), to_day(dates[-1]) + 1
+
+
+def portfolio_overview(view):
+    """Month-to-date target progress for every account, from one grouped query."""
+    portfolio = view.portfolio
+    accounts, sums = view.store.account_totals(view.month_start, view.month_stop)
+    totals = portfolio.align(accounts, sums)
+    metrics = compute_metrics(totals, portfolio.monthly_target, view.today, view.last_day)
+    return overview(portfolio, totals, metrics)
+
+
+def project_month(view, month_total):
+    """Bootstrap the rest of the month from this account's daily P&L history."""
+    days, pnl = view.risk.days.copy(), view.risk.pnl.copy()
+    today = to_day(view.today)
+    sessions = remaining_sessions(today, view.month_stop, len(days) > 0 and days[-1] == today)
+    # Seeded by the account revision: reruns show the same numbers until a write.
+    projection = simulate(pnl, month_total, view.account.monthly_target, sessions, seed=view.account.revision)
+    return projection, today
+
+
+# ----------------------------
+# PANELS
+# ----------------------------
+def metric_box(title, value):
+    st.markdown('<div class="metric-box"><h1>{}</h1><h1>{}</h1></div>'.format(title, value), unsafe_allow_html=True)
+
+
+@contextmanager
+def deferred_panel(label, key):
+    """Yield whether a heavy panel should build in this run.
+
+    Always true normally. In fast-start mode the panel sits in an expander
+    that starts collapsed and reruns its fragment when toggled, so the body
+    is skipped entirely until someone opens it.
+    """
+    if not FAST_START:
+        yield True
+        return
+    box = st.expander(label, key=key, on_change="rerun")
+    with box:
+        yield box.open
+
+
+def render_theme(view):
+    view.guard.mark("theme")
+    st.markdown(get_theme(), unsafe_allow_html=True)
+    st.markdown("<h1 style='text-align:center; color:#00ffe1;'>🧠 Sci-Fi Trading Performance HUD</h1>", unsafe_allow_html=True)
+
+
+def add_entry(refresh):
+    view = View("add_entry")
+    date_input, pl_input = st.session_state.entry_date, st.session_state.entry_pnl
+    if st.session_state.get("entry_replace"):
+        view.state.correct(view.store.upsert_day(date_input, pl_input, view.account.id))
+    else:
+        revision = view.store.add_entry(date_input, pl_input, view.account.id)
+        view.state.apply(revision, date_input, pl_input)
+    view.written()
+    # Only the fragments that read the store need to redraw.
+    st.rerun(refresh)
+
+
+def render_entry_form(view, refresh):
+    view.guard.mark("entry_form")
+    store, aggregates = view.store, view.aggregates
+    st.markdown(f"## 📆 Enter Daily P&L · {view.account.name}")
+    entry_date = st.date_input("Date", value=view.today, key="entry_date")
+    st.number_input("Profit/Loss (₹)", step=100.0, format="%.2f", value=0.0, key="entry_pnl")
+    replace = st.checkbox("Replace the day's P&L", key="entry_replace")
+    count, total = store.day_summary(entry_date, view.account.id)
+    if count:
+        action = "replaces" if replace else "adds to"
+        st.caption(f"{entry_date} already has ₹{total:,.2f} in {count:,} entr{'y' if count == 1 else 'ies'}; Add Entry {action} it.")
+    st.button("Add Entry", key="entry_add", on_click=add_entry, args=(refresh,))
+
+    st.markdown("## 📥 Bulk Import")
+    upload = st.file_uploader("CSV / Excel / contract note", type=["csv", "xlsx", "xlsm"], key="import_file")
+    import_mode = st.radio("File type", list(IMPORT_MODES), horizontal=True, key="import_mode")
+    dayfirst = st.checkbox("Day-first dates (DD-MM-YYYY)", key="import_dayfirst")
+    if upload is not None and st.button("Import", key="import_run"):
+        import_bar = st.progress(0.0)
+        try:
+            result = import_file(store, upload, upload.name, mode=IMPORT_MODES[import_mode], dayfirst=dayfirst,
+                                 progress=import_bar.progress, account=view.account.id)
+        except (ValueError, ImportError) as exc:
+            st.error(f"Import failed: {exc}")
+        else:
+            view.state.invalidate()
+            view.written()
+            st.session_state.import_message = (
+                f"Imported {result.inserted:,} days from {result.rows_read:,} rows "
+                f"({result.rows_rejected:,} invalid, {result.duplicates:,} duplicate, {result.skipped_existing:,} already stored).")
+            # Keyed reruns are only allowed from callbacks, so a (rare) bulk
+            # import refreshes the whole app to show the progress bar first.
+            st.rerun()
+    if "import_message" in st.session_state:
+        st.success(st.session_state.pop("import_message"))
+
+
+def add_account():
+    state = st.session_state
+    name = state.new_account_name.strip()
+    if not name:
+        state.account_error = "Account name is required."
+        return
+    try:
+        state.account = get_store().add_account(name, state.new_account_capital, state.new_account_leverage, state.new_account_target)
+    except ValueError as exc:
+        state.account_error = str(exc)
+
+
+def render_account_picker(view):
+    view.guard.mark("account_picker")
+    portfolio = view.portfolio
+    with st.sidebar:
+        st.markdown("## 🏦 Account")
+        st.selectbox("Account", portfolio.ids.tolist(), format_func=portfolio.name, key="account", label_visibility="collapsed")
+        st.toggle("🗂️ Portfolio overview", key="portfolio_mode")
+        with st.expander("➕ New account"):
+            st.text_input("Name", key="new_account_name")
+            st.number_input("Capital (₹)", min_value=0.0, value=20000.0, step=1000.0, key="new_account_capital")
+            st.number_input("Leverage (x)", min_value=0.0, value=5.0, step=0.5, key="new_account_leverage")
+            st.number_input("Monthly target (%)", min_value=0.0, value=5.0, step=0.5, key="new_account_target")
+            st.button("Create", key="new_account_add", on_click=add_account)
+        if "account_error" in st.session_state:
+            st.error(st.session_state.pop("account_error"))
+
+
+def select_account():
+    # Row positions refer to the table as built, not as sorted in the browser.
+    rows = st.session_state.portfolio_table.selection.rows
+    if rows:
+        st.session_state.account = int(View("select_account").portfolio.ids[rows[0]])
+        # The drill-down spans panels outside this fragment.
+        st.rerun()
+
+
+def render_portfolio(view):
+    view.guard.mark("portfolio")
+    st.markdown("### 🗂️ Portfolio Overview")
+    table = view.cached("portfolio_overview", lambda: portfolio_overview(view), shared=True)
+    st.caption(f"{len(table):,} accounts · click a column to sort, select a row to drill down.")
+    money = st.column_config.NumberColumn(format="₹%,.0f")
+    st.dataframe(
+        table, hide_index=True, use_container_width=True, key="portfolio_table",
+        on_select=select_account, selection_mode="single-row",
+        column_config={
+            "Capital": money, "Exposure": money, "Monthly Target": money, "Current P&L": money,
+            "Remaining": money, "Daily Needed": money,
+            "Leverage": st.column_config.NumberColumn(format="%.1fx"),
+            "Progress %": st.column_config.ProgressColumn(min_value=0, max_value=100, format="%.0f%%"),
+        },
+    )
+
+
+def render_static_panels(view):
+    view.guard.mark("static_panels")
+    account = view.account
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        metric_box("💼 Capital", "₹{:,.0f}".format(account.capital))
+    with col2:
+        metric_box("⚡ Leverage", "{:g}x".format(account.leverage))
+    with col3:
+        metric_box("📊 Exposure", "₹{:,.0f}".format(account.exposure))
+
+
+def render_metric_panels(view, metrics):
+    view.guard.mark("metrics")
+    col4, col5, col6 = st.columns(3)
+    with col4:
+        metric_box("🎯 Monthly Target", "₹{:,}".format(int(view.account.monthly_target)))
+    with col5:
+        metric_box("💹 Current P&L", "₹{:,}".format(int(metrics.total_pnl)))
+    with col6:
+        status = "🎉 Target Hit" if metrics.remaining <= 0 else f"₹{metrics.daily_needed:,.0f}/day"
+        metric_box("⏳ Days Left", "{} | {}".format(metrics.days_left, status))
+
+
+def book_live(refresh, day, amount):
+    view = View("book_live")
+    revision = view.store.add_entry(day_to_date(day), amount, view.account.id)
+    view.state.apply(revision, day_to_date(day), amount)
+    get_live_feed().book(view.account.id, day, amount)
+    view.written()
+    st.rerun(refresh)
+
+
+def render_live(view, feed, live, refresh):
+    view.guard.mark("live")
+    if feed.error:
+        st.error(f"Live feed stopped: {feed.error}")
+    snapshot = feed.snapshot
+    if live is None or not live.events:
+        st.caption("📡 Live feed: waiting for events.")
+        return
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.caption("📡 Live today: ₹{:,.2f} not yet booked · {:,} events · updated {:.0f}s ago".format(
+            live.pnl, live.events, time.time() - snapshot.taken))
+    with col2:
+        amount = round(live.pnl, 2)
+        st.button("📥 Book live P&L", key="live_book", disabled=amount == 0,
+                  on_click=book_live, args=(refresh, to_day(view.today), amount))
+
+
+def render_progress(view, metrics):
+    view.guard.mark("progress")
+    st.markdown("### 🔋 Target Completion")
+    st.progress(max(0.0, metrics.progress_percent) / 100)
+
+
+def render_charts(view, month_agg):
+    view.guard.mark("charts")
+    store = view.store
+    chart_span = st.radio("📅 Chart span", CHART_SPANS, horizontal=True, key="chart_span")
+    if chart_span == "All history":
+        chart_days, chart_pnl = view.cached("history_arrays", lambda: store.load_arrays(account=view.account.id))
+    else:
+        chart_days, chart_pnl = view.cached("month_arrays", lambda: store.load_arrays(view.month_start, view.month_stop, view.account.id))
+
+    if len(chart_days):
+        zoom = None
+        if chart_span == "All history" and chart_days[-1] > chart_days[0]:
+            first, last = day_to_date(chart_days[0]), day_to_date(chart_days[-1])
+            zoom = st.slider("🔍 Zoom", min_value=first, max_value=last, value=(first, last), format="YYYY-MM-DD", key="chart_zoom")
+        window = range_slice(chart_days, to_day(zoom[0]), to_day(zoom[1]) + 1) if zoom else slice(None)
+        chart_cumulative = view.cached(("cumulative", chart_span), lambda: chart_pnl.cumsum())
+
+        st.markdown("### 📊 Daily P&L Chart")
+        bar_chart = view.cached(("bar_chart", chart_span, zoom), lambda: series_figure(chart_days[window], chart_pnl[window], 'Daily P&L', 'Profit/Loss', kind="bar"))
+        st.plotly_chart(bar_chart, use_container_width=True)
+
+        st.markdown("### 📈 Cumulative P&L Over Time")
+        line_chart = view.cached(("line_chart", chart_span, zoom), lambda: series_figure(chart_days[window], chart_cumulative[window], 'Cumulative P&L', 'cumulative'))
+        st.plotly_chart(line_chart, use_container_width=True)
+
+    if month_agg.count:
+        st.markdown("### 🧩 Win vs Loss Days")
+        pie_chart = view.cached("pie_chart", lambda: pie_figure([month_agg.wins, month_agg.losses], ['Win', 'Loss'], 'Win/Loss Distribution'))
+        st.plotly_chart(pie_chart, use_container_width=True)
+
+
+def render_risk(view, charts):
+    view.guard.mark("risk")
+    risk = view.risk.summary()
+    st.markdown("### 🛡️ Risk")
+    if not risk["days"]:
+        st.write("No data yet.")
+        return
+    streak = risk["streak"]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        metric_box("📉 Max Drawdown", "₹{:,.0f} | {}d".format(risk["max_drawdown"], risk["max_drawdown_days"]))
+    with col2:
+        metric_box("📐 Sharpe / Sortino", "{:.2f} / {:.2f}".format(risk["sharpe"], risk["sortino"]))
+    with col3:
+        metric_box("⚖️ Profit Factor", "{:.2f}".format(risk["profit_factor"]))
+    with col4:
+        metric_box("🔥 Streak", "{}{} | best {}W / {}L".format(abs(streak), "W" if streak > 0 else "L" if streak < 0 else "", risk["best_win_streak"], risk["worst_loss_streak"]))
+    windows = {f"{w}-day": view.risk.latest_window(w) for w in ROLLING_WINDOWS}
+    st.caption(" · ".join("{}: ₹{:,.0f}, {:.0%} wins, Sharpe {:.2f}".format(name, w["sum"], w["win_rate"], w["sharpe"]) for name, w in windows.items()))
+    if charts:
+        rolling_chart = view.cached("rolling_chart", lambda: rolling_figure(view.risk.rolling()))
+        st.plotly_chart(rolling_chart, use_container_width=True)
+
+
+def rolling_figure(rolling):
+    series = {f"{w}-day": rolling[f"sharpe_{w}d"].to_numpy() for w in ROLLING_WINDOWS}
+    return lines_figure(rolling["day"].to_numpy(), series, 'Rolling Sharpe (annualised)', 'Sharpe')
+
+
+def render_range(view):
+    view.guard.mark("range")
+    st.markdown("### 📆 Range Analytics")
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        period = st.selectbox("Range", list(RANGE_PERIODS), index=1, key="range_period")
+    if RANGE_PERIODS[period] is None:
+        with col2:
+            st.date_input("Dates", value=(view.today - timedelta(days=CUSTOM_RANGE_DAYS), view.today), key="range_custom")
+    start, stop = range_bounds(view, period)
+    # Built once per revision; every range after that is two lookups per
+    # statistic, so changing the range never regroups any entries.
+    stats = view.cached("range_index", lambda: view.state.range_index()).stats(start, stop)
+    metrics = range_metrics(stats.total, view.account.monthly_target, start, stop, to_day(view.today))
+    target = metrics.total_pnl + metrics.remaining
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        metric_box("💹 Range P&L", "₹{:,.0f}".format(stats.total))
+    with col2:
+        metric_box("🏆 Win Days", "{:.0%} of {:,}".format(stats.win_rate, stats.days) if stats.days else "–")
+    with col3:
+        metric_box("🎯 Target", "{:.0f}% of ₹{:,.0f}".format(metrics.progress_percent, target))
+    caption = "{} → {} · {:,} entries · ₹{:,.0f} per trading day".format(
+        day_to_date(start), day_to_date(stop - 1), stats.entries, stats.average)
+    if metrics.days_left and metrics.remaining > 0:
+        caption += " · ₹{:,.0f}/day needed over {} day(s) left".format(metrics.daily_needed, metrics.days_left)
+    st.caption(caption)
+
+
+def render_projection(view, charts):
+    view.guard.mark("projection")
+    st.markdown("### 🎲 Target Probability")
+    month_total = view.aggregates.month(view.current_month).total
+    # Keyed on today too: the remaining sessions shrink as the month goes on.
+    day = to_day(view.today)
+    projection, today = view.cached(("projection", day), lambda: project_month(view, month_total))
+    if projection is None:
+        st.write(f"Needs at least {MIN_HISTORY} trading days of history.")
+        return
+    metric_box("🎯 Chance of Hitting Target", "{:.0%}".format(projection.probability))
+    st.caption("{:,} bootstrapped paths over {} remaining sessions; median month-end P&L ₹{:,.0f}.".format(
+        projection.paths, len(projection.session_days), projection.median_final))
+    if charts:
+        fan_chart = view.cached(("fan_chart", day), lambda: fan_figure(
+            [today, *projection.session_days], projection.fan, FAN_QUANTILES, view.account.monthly_target, 'Month-End P&L Projection'))
+        st.plotly_chart(fan_chart, use_container_width=True)
+    else:
+        st.table({f"p{q * 100:g}": ["₹{:,.0f}".format(projection.fan[i, -1])] for i, q in enumerate(FAN_QUANTILES)})
+
+
+def render_fill_rollups(view, fill_rollups, charts):
+    view.guard.mark("fill_rollups")
+    if fill_rollups is None:
+        return
+    st.markdown("### 🧬 P&L by Symbol / Strategy")
+    symbol_col, strategy_col = st.columns(2)
+    for column, key in ((symbol_col, "symbol"), (strategy_col, "strategy")):
+        with column:
+            if charts:
+                chart = view.cached(key + "_chart", lambda: bar_figure(fill_rollups[key][key], fill_rollups[key]['pnl'], f'P&L by {key.title()}', key, 'Profit/Loss'))
+                st.plotly_chart(chart, use_container_width=True)
+            else:
+                st.dataframe(fill_rollups[key], use_container_width=True)
+
+
+def save_edits(refresh, editor_key, ids, revisions):
+    view = View("save_edits")
+    editor = st.session_state[editor_key]
+    deleted = set(editor["deleted_rows"])
+    writes = [(view.store.delete_entry, (ids[row], revisions[row])) for row in sorted(deleted)]
+    conflicts = []
+    for row, changes in editor["edited_rows"].items():
+        if row in deleted or "Profit/Loss (₹)" not in changes:
+            continue
+        pnl = changes["Profit/Loss (₹)"]
+        if pnl is None or not math.isfinite(pnl):
+            # A cleared cell; delete the row to remove an entry.
+            conflicts.append(f"Entry {ids[row]} needs a P&L value")
+            continue
+        writes.append((view.store.update_entry, (ids[row], pnl, revisions[row])))
+    saved = 0
+    try:
+        for write, args in writes:
+            try:
+                # Each change moves the in-memory totals by its delta instead
+                # of forcing a reload of the account.
+                view.state.correct(write(*args))
+                saved += 1
+            except ConflictError as exc:
+                conflicts.append(str(exc))
+    finally:
+        view.written()
+    if conflicts:
+        st.session_state.edit_error = "; ".join(conflicts) + ". Showing the latest values."
+    elif saved:
+        st.session_state.edit_message = f"Saved {saved} change(s)."
+    st.rerun(refresh)
+
+
+def first_entries_page():
+    st.session_state.entries_page = 1
+
+
+def entries_query():
+    """The browser's filters as a hashable ``(start, stop, sign, min_abs, sort, page)``."""
+    state = st.session_state
+    dates = state.get("entries_range") or ()
+    start = to_day(dates[0]) if len(dates) > 0 else None
+    stop = to_day(dates[1]) + 1 if len(dates) > 1 else None
+    return start, stop, state.get("entries_sign", "All"), state.get("entries_min") or None, \
+        state.get("entries_sort", "Newest first"), state.get("entries_page", 1)
+
+
+def render_entries_table(view, refresh):
+    view.guard.mark("entries_table")
+    st.markdown("### 📋 Daily P&L Entries")
+    if "edit_error" in st.session_state:
+        st.error(st.session_state.pop("edit_error"))
+    if "edit_message" in st.session_state:
+        st.success(st.session_state.pop("edit_message"))
+    # Filters, sort and paging run as one indexed query per page, so only
+    # PAGE_SIZE rows of the full history ever reach the browser.
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        st.date_input("Dates", value=(), key="entries_range", on_change=first_entries_page)
+    with col2:
+        st.selectbox("Sign", list(ENTRY_SIGNS), key="entries_sign", on_change=first_entries_page)
+    with col3:
+        st.number_input("Min size (₹)", min_value=0.0, value=0.0, step=100.0, key="entries_min", on_change=first_entries_page)
+    with col4:
+        st.selectbox("Sort", list(ENTRY_SORTS), key="entries_sort", on_change=first_entries_page)
+    query = entries_query()
+    total, rows = view.cached(("entries_page", query), lambda: entries_page(view, query))
+    if total == 0:
+        start, stop, sign, min_abs = query[:4]
+        filtered = start is not None or stop is not None or sign != "All" or min_abs
+        st.write("No entries match these filters." if filtered else "No entries yet.")
+        return
+    pages = -(-total // PAGE_SIZE)
+    page = query[-1]
+    if page > pages:
+        # The filter shrank under this page (e.g. another session deleted rows).
+        st.session_state.entries_page = page = pages
+        query = query[:-1] + (page,)
+        total, rows = view.cached(("entries_page", query), lambda: entries_page(view, query))
+    first = (page - 1) * PAGE_SIZE
+    st.caption(f"Showing {first + 1:,}–{first + len(rows):,} of {total:,} entries.")
+
+    # Edits and deletes are saved against the revision each row was read
+    # at; a row that another session changed in the meantime is rejected,
+    # not overwritten. The editor key follows the account revision and the
+    # query, so a reload or a new page starts clean.
+    table = rows.frame(("date", "pnl")).rename(columns={'date': 'Date', 'pnl': 'Profit/Loss (₹)'})
+    # The account's running total at each row's day close, read off the ledger.
+    table["Running Total (₹)"] = view.state.ledger.running(rows.days)
+    editor_key = "entries_editor_{}_{}_{:x}".format(view.account.id, view.account.revision, hash(query) & 0xffffffff)
+    st.data_editor(table, use_container_width=True, hide_index=True, num_rows="delete",
+                   disabled=["Date", "Running Total (₹)"], key=editor_key,
+                   column_config={"Profit/Loss (₹)": st.column_config.NumberColumn(required=True)})
+    ids, revisions = rows.ids.tolist(), rows.revisions.tolist()
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        st.button("💾 Save changes", key="entries_save", on_click=save_edits, args=(refresh, editor_key, ids, revisions))
+    with col2:
+        st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, step=1, key="entries_page")
+
+
+def render_monthly_summary(view, charts):
+    view.guard.mark("monthly_summary")
+    st.markdown("### 🧾 Monthly Summary")
+    if not view.aggregates.months:
+        st.write("No data yet.")
+        return
+    summary = view.cached("monthly_summary", lambda: monthly_summary(view))
+    if charts:
+        summary_chart = view.cached("summary_chart", lambda: bar_figure(summary['Month'], summary['Total P&L'], 'Monthly Total P&L', 'Month', 'Total P&L'))
+        st.plotly_chart(summary_chart, use_container_width=True)
+        heatmap = view.cached("calendar_heatmap", lambda: calendar_figure(*view.calendar.window(CALENDAR_YEARS), 'Daily P&L Calendar'))
+        st.plotly_chart(heatmap, use_container_width=True)
+    else:
+        money = st.column_config.NumberColumn(format="₹%,.0f")
+        st.dataframe(summary, hide_index=True, use_container_width=True, column_config={
+            "Total P&L": money, "Best P&L": money, "Worst P&L": money, "Cumulative": money,
+            "Win %": st.column_config.NumberColumn(format="%.0f%%"),
+        })
+
+
+def render_cache_stats(view):
+    view.guard.mark("cache_stats")
+    cache_stats = view.cache.stats()
+    st.sidebar.caption("Cache: {hits} hits / {misses} misses ({hit_rate:.0%}), {entries} entries, {bytes:,} bytes".format(**cache_stats))
+
+
+def render_timings(view):
+    view.guard.mark("timings")
+    if not st.sidebar.toggle("⏱️ Show rerun timings", key="debug_timings"):
+        return
+    with st.expander("⏱️ Rerun timings", expanded=True):
+        st.caption(f"{view.profiler.runs:,} app/fragment runs profiled; percentiles over the last {view.profiler.window}.")
+        st.dataframe(view.profiler.summary(), use_container_width=True)
+
+
+# ----------------------------
+# FRAGMENTS
+# ----------------------------
+# Widgets inside a fragment rerun only that fragment, and "Add Entry"
+# reruns just the fragments that read the store. The CSS, header and the
+# Capital / Leverage / Exposure row live outside every fragment, so they
+# are sent once per full app run and never on an input change.
+@st.fragment(key="input")
+def input_fragment(refresh):
+    view = View("input")
+    with st.sidebar:
+        render_entry_form(view, refresh)
+    view.finish()
+
+
+@st.fragment(key="portfolio")
+def portfolio_fragment():
+    view = View("portfolio")
+    with view.timings.section("portfolio"):
+        render_portfolio(view)
+    view.finish()
+
+
+# With a live feed the HUD polls the latest coalesced snapshot on a timer:
+# one rerun of this fragment per interval however many events arrived.
+@st.fragment(key="hud", run_every=SNAPSHOT_INTERVAL if LIVE_SOURCE else None)
+def hud_fragment(refresh):
+    view = View("hud")
+    timings = view.timings
+    feed = get_live_feed()
+    with timings.section("data_processing"):
+        total = month_total(view)
+        live = feed.snapshot.get(view.account.id, to_day(view.today)) if feed else None
+        if live is not None:
+            total += live.pnl
+    with timings.section("calculations"):
+        metrics = compute_metrics(total, view.account.monthly_target, view.today, view.last_day)
+    with timings.section("metric_panels"):
+        render_metric_panels(view, metrics)
+        render_progress(view, metrics)
+        if feed:
+            render_live(view, feed, live, refresh)
+    view.finish()
+
+
+@st.fragment(key="range")
+def range_fragment():
+    view = View("range")
+    with deferred_panel("📆 Range Analytics", "range_open") as build:
+        if build:
+            with view.timings.section("range"):
+                render_range(view)
+    view.finish()
+
+
+@st.fragment(key="projection")
+def projection_fragment(charts):
+    view = View("projection")
+    with deferred_panel("🎲 Target Probability", "projection_open") as build:
+        if build:
+            with view.timings.section("projection"):
+                render_projection(view, charts)
+    view.finish()
+
+
+@st.fragment(key="charts")
+def charts_fragment():
+    view = View("charts")
+    timings = view.timings
+    with deferred_panel("📊 Charts", "charts_open") as build:
+        if build:
+            with timings.section("data_processing"):
+                month_agg, fill_rollups = load_month(view)
+            with timings.section("visualizations"):
+                render_charts(view, month_agg)
+                render_fill_rollups(view, fill_rollups, charts=True)
+    view.finish()
+
+
+@st.fragment(key="risk")
+def risk_fragment(charts):
+    view = View("risk")
+    with deferred_panel("🛡️ Risk", "risk_open") as build:
+        if build:
+            with view.timings.section("risk"):
+                render_risk(view, charts)
+    view.finish()
+
+
+@st.fragment(key="tables")
+def tables_fragment(charts, refresh):
+    view = View("tables")
+    timings = view.timings
+    with deferred_panel("📋 Entries & Monthly Summary", "tables_open") as build:
+        if build:
+            with timings.section("data_tables"):
+                render_entries_table(view, refresh)
+                if not charts:
+                    _, fill_rollups = load_month(view)
+                    render_fill_rollups(view, fill_rollups, charts=False)
+                render_monthly_summary(view, charts)
+    view.finish()
+
+
+@st.fragment(key="diagnostics")
+def diagnostics_fragment():
+    view = View("diagnostics")
+    render_cache_stats(view)
+    render_timings(view)
+
+
+# ----------------------------
+# ENTRY POINT
+# ----------------------------
+def run(charts=True, started=None):
+    """Render the whole dashboard once; ``charts=False`` is the table-only layout.
+
+    ``started`` is the entry script's ``perf_counter()`` from before it
+    imported this module, so the first run in a process also counts the
+    imports in its ``first_paint`` time (script start to HUD sent).
+    """
+    st.set_page_config(layout="wide", page_title="Sci-Fi Trading Dashboard")
+    view = View()
+    started = started if started is not None else view.timings.started
+    refresh = ["hud", "range", "projection", "charts", "risk", "tables", "diagnostics"] if charts else ["hud", "range", "projection", "risk", "tables", "diagnostics"]
+    render_theme(view)
+    render_account_picker(view)
+    if st.session_state.portfolio_mode:
+        refresh.insert(0, "portfolio")
+        portfolio_fragment()
+    render_static_panels(view)
+    input_fragment(refresh)
+    hud_fragment(refresh)
+    view.timings.add("first_paint", time.perf_counter() - started)
+    range_fragment()
+    projection_fragment(charts)
+    if charts:
+        charts_fragment()
+    risk_fragment(charts)
+    tables_fragment(charts, refresh)
+    view.finish()
+    diagnostics_fragment()
+    return view
@@ -0,0 +1,219 @@
+import calendar
+import threading
+
+import numpy as np
+
+from pnl_dates import days_to_datetime64, month_offsets, to_month
+from pnl_store import DEFAULT_ACCOUNT
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+# Zero-based day of a leap year that is Feb 29.
+FEB_29 = 59
+
+
+# ----------------------------
+# MONTH AGGREGATE
+# ----------------------------
+class MonthAggregate:
+    __slots__ = ("total", "wins", "losses", "count")
+
+    def __init__(self, total=0.0, wins=0, losses=0, count=0):
+        self.total = total
+        self.wins = wins
+        self.losses = losses
+        self.count = count
+
+    def add(self, pnl):
+        self.total += pnl
+        self.count += 1
+        if pnl > 0:
+            self.wins += 1
+        else:
+            self.losses += 1
+
+    def remove(self, pnl):
+        self.total -= pnl
+        self.count -= 1
+        if pnl > 0:
+            self.wins -= 1
+        else:
+            self.losses -= 1
+
+
+EMPTY_MONTH = MonthAggregate()
+
+
+# ----------------------------
+# RUNNING AGGREGATES
+# ----------------------------
+class RunningAggregates:
+    """Materialised per-month totals, win/loss counts and the running total.
+
+    Built once from a vectorised pass over the store's day/pnl arrays and
+    then updated in O(1) per added, edited or deleted entry, so panels never
+    regroup the history on a rerun.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.months = {}
+        self.total = 0.0
+        self.count = 0
+
+    @classmethod
+    def from_store(cls, store, account=DEFAULT_ACCOUNT):
+        aggregates = cls()
+        aggregates.add_arrays(*store.load_arrays(account=account))
+        return aggregates
+
+    @classmethod
+    def from_rollups(cls, rollups):
+        """Start from checkpointed month rollups instead of their raw rows."""
+        aggregates = cls()
+        for key, total, wins, losses, count in zip(rollups["month"].tolist(), rollups["total"].tolist(), rollups["wins"].tolist(),
+                                                   rollups["losses"].tolist(), rollups["entries"].tolist()):
+            aggregates.months[key] = MonthAggregate(total, wins, losses, count)
+        aggregates.total = float(rollups["total"].sum())
+        aggregates.count = int(rollups["entries"].sum())
+        return aggregates
+
+    def add_arrays(self, days, pnl):
+        """Fold a batch of entries in with one vectorised pass per batch."""
+        days = np.asarray(days)
+        pnl = np.asarray(pnl, dtype=np.float64)
+        if len(days) == 0:
+            return
+        if np.any(days[1:] < days[:-1]):
+            order = np.argsort(days, kind="stable")
+            days, pnl = days[order], pnl[order]
+        months, offsets = month_offsets(days)
+        starts = offsets[:-1]
+        totals = np.add.reduceat(pnl, starts)
+        wins = np.add.reduceat((pnl > 0).astype(np.int64), starts)
+        counts = np.diff(offsets)
+        with self._lock:
+            for key, total, win, count in zip(months.tolist(), totals.tolist(), wins.tolist(), counts.tolist()):
+                month = self.months.get(key)
+                if month is None:
+                    month = self.months[key] = MonthAggregate()
+                month.total += total
+                month.wins += win
+                month.losses += count - win
+                month.count += count
+            self.total += float(pnl.sum())
+            self.count += len(pnl)
+
+    def add(self, date, pnl):
+        pnl = float(pnl)
+        key = to_month(date)
+        with self._lock:
+            month = self.months.get(key)
+            if month is None:
+                month = self.months[key] = MonthAggregate()
+            month.add(pnl)
+            self.total += pnl
+            self.count += 1
+
+    def remove(self, date, pnl):
+        """Take back an entry that was ``add``-ed (or loaded); an edit is a remove plus an add."""
+        pnl = float(pnl)
+        key = to_month(date)
+        with self._lock:
+            month = self.months[key]
+            month.remove(pnl)
+            if not month.count:
+                del self.months[key]
+            self.total -= pnl
+            self.count -= 1
+
+    def month(self, key):
+        return self.months.get(key, EMPTY_MONTH)
+
+
+# ----------------------------
+# CALENDAR MATRIX
+# ----------------------------
+class CalendarMatrix:
+    """Daily P&L as a dense ``years x 366`` matrix, column = day of a leap year.
+
+    Every year uses the leap-year columns, so a date sits under the same
+    column in every row and the Feb 29 column stays NaN outside leap years.
+
+    Built with one scatter-add over the day ordinals and then updated in
+    place per entry, so a multi-year heatmap is a slice of this array rather
+    than a groupby/pivot of the history. Days with no entries stay NaN.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.first_year = None
+        self.values = np.empty((0, 366), dtype=np.float64)
+
+    @property
+    def years(self):
+        if self.first_year is None:
+            return np.empty(0, dtype=np.int64)
+        return np.arange(self.first_year, self.first_year + len(self.values))
+
+    def add_arrays(self, days, pnl):
+        days = np.asarray(days, dtype=np.int64)
+        if len(days) == 0:
+            return
+        years, day_of_year = _year_and_day(days)
+        with self._lock:
+            self._cover(int(years.min()), int(years.max()))
+            rows = years - self.first_year
+            block = self.values[rows.min():rows.max() + 1]
+            cells = (rows - rows.min()) * 366 + day_of_year
+            sums = np.bincount(cells, weights=pnl, minlength=block.size).reshape(block.shape)
+            touched = np.bincount(cells, minlength=block.size).reshape(block.shape) > 0
+            block[touched] = np.nan_to_num(block[touched]) + sums[touched]
+
+    def add(self, date, pnl):
+        year, day_of_year = date.year, _column(date)
+        with self._lock:
+            self._cover(year, year)
+            row = self.values[year - self.first_year]
+            row[day_of_year] = float(pnl) + (0.0 if np.isnan(row[day_of_year]) else row[day_of_year])
+
+    def clear(self, date):
+        """Back to no entries (NaN) for ``date``, e.g. after its last entry was deleted."""
+        with self._lock:
+            if self.first_year is not None and 0 <= date.year - self.first_year < len(self.values):
+                self.values[date.year - self.first_year, _column(date)] = np.nan
+
+    def window(self, years):
+        """The last ``years`` rows as ``(years, matrix)``; a copy, safe to hand to a figure."""
+        with self._lock:
+            return self.years[-years:], self.values[-years:].copy()
+
+    def _cover(self, low, high):
+        # Grow to span [low, high]; years arrive almost always at the end.
+        if self.first_year is None:
+            self.first_year = low
+            self.values = np.full((high - low + 1, 366), np.nan)
+            return
+        last = self.first_year + len(self.values) - 1
+        if low < self.first_year:
+            self.values = np.vstack((np.full((self.first_year - low, 366), np.nan), self.values))
+            self.first_year = low
+        if high > last:
+            self.values = np.vstack((self.values, np.full((high - last, 366), np.nan)))
+
+
+def _column(date):
+    day_of_year = date.timetuple().tm_yday - 1
+    # Skip the Feb 29 column from March on in common years.
+    return day_of_year + 1 if day_of_year >= FEB_29 and not calendar.isleap(date.year) else day_of_year
+
+
+def _year_and_day(days):
+    """Year and leap-year column (see ``_column``) of each day ordinal."""
+    dates = days_to_datetime64(days)
+    years = dates.astype("datetime64[Y]")
+    year = years.astype(np.int64) + 1970
+    day_of_year = (dates - years.astype("datetime64[D]")).astype(np.int64)
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    return year, day_of_year + ((day_of_year >= FEB_29) & ~leap)
@@ -0,0 +1,177 @@
+"""Memory-mapped Arrow snapshots of the entry history, for instant reopen and backups.
+
+An export is one uncompressed Arrow IPC (Feather v2) file holding a
+``day``/``pnl`` record batch per account, sorted by day, plus the accounts'
+parameters and the revision each was read at:
+
+    python pnl_arrow.py export history.arrow              # every account
+    python pnl_arrow.py export history.arrow --accounts 1,3
+    python pnl_arrow.py info history.arrow
+    python pnl_arrow.py restore history.arrow             # replace those accounts
+
+Point ``PNL_ARROW`` at an export and the dashboards memory-map it at start:
+whole-history reads for every account still at its exported revision slice
+the mapped columns (zero-copy, paging in only the days a panel touches)
+instead of fetching millions of rows from SQLite. An account written since
+falls back to SQLite until the next export, and an export taken from a
+different store file is refused. Fills are not exported, and a restore
+leaves them as they are. Needs the optional ``pyarrow`` package.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from pnl_store import DB_PATH, SCHEMA_VERSION, PnLStore
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+METADATA_KEY = b"pnl"
+FORMAT_VERSION = 1
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as exc:
+        raise ImportError("Arrow snapshots need pyarrow: pip install pyarrow") from exc
+    return pa
+
+
+# ----------------------------
+# EXPORT / RESTORE
+# ----------------------------
+def export_history(store, path, accounts=None):
+    """Write the history of ``accounts`` (ids; default all) to ``path``; returns rows written.
+
+    The file is written next to ``path`` and renamed over it, so a process
+    that has the previous export mapped keeps reading that one intact.
+    """
+    pa = _pyarrow()
+    rows = [row for row in store.accounts() if accounts is None or row[0] in accounts]
+    meta, batches = [], []
+    for i, (account, name, capital, leverage, target_percent, _) in enumerate(rows):
+        revision, days, pnl = store.snapshot(account)
+        meta.append({"id": account, "name": name, "capital": capital, "leverage": leverage,
+                     "target_percent": target_percent, "revision": revision, "batch": i, "rows": len(days)})
+        batches.append((np.asarray(days, dtype=np.int32), np.asarray(pnl, dtype=np.float64)))
+    header = {"format": FORMAT_VERSION, "schema_version": SCHEMA_VERSION, "instance": store.instance,
+              "exported": datetime.now().isoformat(timespec="seconds"), "accounts": meta}
+    schema = pa.schema([("day", pa.int32()), ("pnl", pa.float64())], metadata={METADATA_KEY: json.dumps(header)})
+    partial = f"{path}.partial"
+    # Uncompressed, so readers can map the columns instead of decoding them.
+    with pa.OSFile(partial, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for days, pnl in batches:
+            writer.write_batch(pa.record_batch([days, pnl], schema=schema))
+    os.replace(partial, path)
+    return sum(len(days) for days, _ in batches)
+
+
+def restore_history(store, path, accounts=None):
+    """Replace ``accounts`` (ids; default every one in the file) with their exported state.
+
+    Each account's parameters and entries are swapped in one transaction;
+    entries get fresh ids. Returns rows written.
+    """
+    history = MappedHistory(path)
+    written = 0
+    with store.batch() as batch:
+        for info in history.accounts.values():
+            if accounts is not None and info["id"] not in accounts:
+                continue
+            batch.put_account(info["id"], info["name"], info["capital"], info["leverage"], info["target_percent"])
+            written += batch.replace_entries(info["id"], *history.arrays(info["id"]))
+    return written
+
+
+# ----------------------------
+# MAPPED HISTORY
+# ----------------------------
+class MappedHistory:
+    """An export opened as a memory map; ``arrays`` are views into the file.
+
+    Opening reads only the footer and schema. Column data is paged in by the
+    OS as it is touched, so a day range costs the pages it spans, found by
+    binary search over the sorted ``day`` column.
+    """
+
+    def __init__(self, path):
+        pa = _pyarrow()
+        self.path = path
+        self._reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        metadata = self._reader.schema.metadata or {}
+        if METADATA_KEY not in metadata:
+            raise ValueError(f"{path} is not a P&L snapshot")
+        header = json.loads(metadata[METADATA_KEY])
+        if header["format"] != FORMAT_VERSION:
+            raise ValueError(f"{path} is snapshot format {header['format']}; expected {FORMAT_VERSION}")
+        self.instance = header["instance"]
+        self.exported = header["exported"]
+        self.accounts = {info["id"]: info for info in header["accounts"]}
+        self._columns = {}
+
+    @property
+    def rows(self):
+        return sum(info["rows"] for info in self.accounts.values())
+
+    def revision(self, account):
+        """The revision ``account`` was exported at, or None if it is not in the file."""
+        info = self.accounts.get(int(account))
+        return None if info is None else info["revision"]
+
+    def arrays(self, account, start=None, stop=None):
+        """Read-only ``(days, pnl)`` views for ``start <= day < stop``, sorted by day."""
+        columns = self._columns.get(int(account))
+        if columns is None:
+            info = self.accounts.get(int(account))
+            if info is None:
+                return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+            batch = self._reader.get_batch(info["batch"])
+            columns = self._columns[int(account)] = tuple(batch.column(i).to_numpy(zero_copy_only=True) for i in range(2))
+        days, pnl = columns
+        lo = 0 if start is None else int(np.searchsorted(days, start, side="left"))
+        hi = len(days) if stop is None else int(np.searchsorted(days, stop, side="left"))
+        return days[lo:hi], pnl[lo:hi]
+
+
+# ----------------------------
+# CLI
+# ----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("action", choices=("export", "restore", "info"))
+    parser.add_argument("path", help="snapshot file (.arrow / .feather)")
+    parser.add_argument("--db", default=DB_PATH, help="store path (default: PNL_DB_PATH or pnl_data.db)")
+    parser.add_argument("--accounts", help="comma-separated account ids (default: all)")
+    args = parser.parse_args(argv)
+    accounts = {int(a) for a in args.accounts.split(",")} if args.accounts else None
+    started = time.perf_counter()
+    try:
+        if args.action == "info":
+            history = MappedHistory(args.path)
+            store = PnLStore(args.db)
+            print(f"{args.path}: {history.rows:,} rows, exported {history.exported}")
+            same = history.instance == store.instance
+            for info in history.accounts.values():
+                state = "current" if same and store.revision(info["id"]) == info["revision"] else "stale"
+                print(f"  {info['id']:>4} {info['name']:<20} {info['rows']:>12,} rows  revision {info['revision']} ({state})")
+            return 0
+        store = PnLStore(args.db)
+        if args.action == "export":
+            rows = export_history(store, args.path, accounts)
+        else:
+            rows = restore_history(store, args.path, accounts)
+    except (ImportError, ValueError, OSError) as exc:
+        parser.error(str(exc))
+    verb = "Exported" if args.action == "export" else "Restored"
+    print(f"{verb} {rows:,} rows in {time.perf_counter() - started:.1f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
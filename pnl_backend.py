@@ -0,0 +1,155 @@
+import threading
+from datetime import date
+
+from pnl_aggregates import CalendarMatrix, RunningAggregates
+from pnl_dates import day_to_date, month_first_day, to_day, to_month
+from pnl_ledger import DayLedger
+from pnl_risk import RiskEngine
+from pnl_rollups import empty_rollups
+
+
+# ----------------------------
+# ACCOUNT STATE
+# ----------------------------
+class AccountState:
+    """One account's in-memory aggregates, day ledger, risk engine and calendar, shared by all sessions.
+
+    The state is tagged with the account revision it reflects. A write made
+    through this process (an add, edit, delete or upsert) is folded in
+    incrementally when it is the very next revision; anything else (another
+    process, two sessions racing) leaves the tag behind and the next reader
+    rebuilds from one consistent store snapshot.
+
+    A rebuild reads the closed months' checkpointed rollups plus the open
+    month's raw rows, so it stays cheap however long the history is. The
+    ledger, risk engine and calendar need every day and are loaded the first
+    time a panel asks for them.
+    """
+
+    def __init__(self, store, account):
+        self.store = store
+        self.account = account
+        self.revision = None
+        self.aggregates = RunningAggregates()
+        self.rollups = empty_rollups()
+        # First day not covered by ``rollups``.
+        self.open_from = None
+        self._ledger = None
+        self._risk = None
+        self._calendar = None
+        self._lock = threading.Lock()
+
+    @property
+    def ledger(self):
+        with self._lock:
+            if self._ledger is None:
+                self._load_history()
+            return self._ledger
+
+    @property
+    def risk(self):
+        with self._lock:
+            if self._risk is None:
+                self._load_history()
+            return self._risk
+
+    @property
+    def calendar(self):
+        with self._lock:
+            if self._calendar is None:
+                self._load_history()
+            return self._calendar
+
+    def range_index(self):
+        """An O(1) range-query index over the ledger as it stands now."""
+        with self._lock:
+            if self._ledger is None:
+                self._load_history()
+            return self._ledger.range_index()
+
+    def current(self, revision):
+        """Return self, rebuilt first if it is behind ``revision``."""
+        with self._lock:
+            if self.revision is None or self.revision < revision:
+                self._rebuild()
+        return self
+
+    def apply(self, revision, date, pnl):
+        """Fold in an entry written as ``revision``, or mark the state stale."""
+        with self._lock:
+            if self.revision == revision - 1:
+                day = to_day(date)
+                self._reopen(day)
+                self.aggregates.add(date, pnl)
+                if self._ledger is not None:
+                    self._ledger.add(day, pnl)
+                if self._risk is not None:
+                    self._risk.add(day, pnl)
+                if self._calendar is not None:
+                    self._calendar.add(date, pnl)
+                self.revision = revision
+            else:
+                self.revision = None
+
+    def correct(self, change):
+        """Fold in an edit, delete or upsert (a store ``EntryChange``), or mark the state stale.
+
+        Month totals and the ledger move by the change's delta, so the
+        running and range totals stay O(log n) to refresh; the risk engine
+        re-derives its statistics from the daily series it already holds.
+        """
+        with self._lock:
+            if self.revision != change.revision - 1:
+                self.revision = None
+                return
+            day, date, delta = change.day, day_to_date(change.day), change.delta
+            self._reopen(day)
+            for pnl in change.removed:
+                self.aggregates.remove(date, pnl)
+            for pnl in change.added:
+                self.aggregates.add(date, pnl)
+            if self._ledger is not None:
+                self._ledger.add(day, delta, len(change.added) - len(change.removed))
+            if self._risk is not None:
+                if change.remaining:
+                    self._risk.add(day, delta)
+                else:
+                    self._risk.remove_day(day)
+            if self._calendar is not None:
+                if change.remaining:
+                    self._calendar.add(date, delta)
+                else:
+                    self._calendar.clear(date)
+            self.revision = change.revision
+
+    def invalidate(self):
+        with self._lock:
+            self.revision = None
+
+    def _rebuild(self):
+        revision, rollups, open_from, days, pnl = self.store.rollup_snapshot(to_month(date.today()), self.account)
+        aggregates = RunningAggregates.from_rollups(rollups)
+        aggregates.add_arrays(days, pnl)
+        self.aggregates, self.rollups, self.open_from, self.revision = aggregates, rollups, open_from, revision
+        self._ledger = self._risk = self._calendar = None
+
+    def _reopen(self, day):
+        # A write in a closed month dropped that month's stored rollups and
+        # every later one; stop serving them here too and read those months
+        # from their rows, until the next rebuild checkpoints them again.
+        if day < self.open_from:
+            month = to_month(day_to_date(day))
+            keep = self.rollups["month"] < month
+            self.rollups = {c: values[keep] for c, values in self.rollups.items()}
+            self.open_from = int(month_first_day(month))
+
+    def _load_history(self):
+        revision, days, pnl = self.store.snapshot(self.account)
+        risk, calendar = RiskEngine(), CalendarMatrix()
+        risk.add_arrays(days, pnl)
+        calendar.add_arrays(days, pnl)
+        self._ledger, self._risk, self._calendar = DayLedger.from_arrays(days, pnl), risk, calendar
+        if revision != self.revision:
+            # A write landed after the aggregates were built: serve this
+            # history now and rebuild everything on the next read.
+            self.revision = None
@@ -0,0 +1,95 @@
+import sys
+import threading
+from collections import OrderedDict
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+# ----------------------------
+# CACHE
+# ----------------------------
+class VersionedCache:
+    """LRU cache for derived frames and figures, keyed on the data version.
+
+    Callers include the store version in the key, so a write makes every
+    stale entry unreachable; writers ``discard`` what they invalidated, and
+    the LRU evicts anything else once ``max_bytes`` is hit.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, builder):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = builder()
+        size = _sizeof(value)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self._bytes += size
+                self._evict()
+        return value
+
+    def discard(self, predicate):
+        """Drop every entry whose key satisfies ``predicate``."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                _, size = self._entries.pop(key)
+                self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _evict(self):
+        # Always keep the newest entry, even if it alone exceeds the budget.
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+
+# ----------------------------
+# HELPERS
+# ----------------------------
+def _sizeof(value):
+    if isinstance(value, dict):
+        return sum(_sizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_sizeof(v) for v in value)
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, "to_json"):
+        return len(value.to_json())
+    if hasattr(value, "nbytes"):
+        # NumPy arrays and EntryArrays; getsizeof misses a view's buffer.
+        return int(value.nbytes)
+    return sys.getsizeof(value)
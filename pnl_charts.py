@@ -0,0 +1,144 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from pnl_dates import days_to_datetime64
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+# Streamlit does not report the browser width, so charts assume a wide
+# layout; two points per pixel is the most a line can visibly show.
+CHART_WIDTH_PX = 1200
+POINTS_PER_PX = 2
+# Above this many points SVG traces get slow to serialise and draw.
+WEBGL_THRESHOLD = 2000
+
+
+# ----------------------------
+# DOWNSAMPLING
+# ----------------------------
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of ``n_out`` shape-preserving points."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    out = np.empty(n_out, dtype=np.intp)
+    out[0], out[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev]))
+        prev = lo + int(area.argmax())
+        out[i + 1] = prev
+    return out
+
+
+def minmax(y, n_buckets):
+    """Indices of the min and max of each bucket, so spikes survive downsampling."""
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    padded = np.pad(y, (0, size * n_buckets - n), constant_values=np.nan).reshape(n_buckets, size)
+    base = np.arange(n_buckets) * size
+    lows = base + np.nanargmin(padded, axis=1)
+    highs = base + np.nanargmax(padded, axis=1)
+    return np.unique(np.concatenate((lows, highs)))
+
+
+# ----------------------------
+# FIGURES
+# ----------------------------
+def series_figure(days, values, title, y_label, kind="line", width_px=CHART_WIDTH_PX):
+    """Line or bar figure whose payload is bounded by ``width_px``.
+
+    Long series are reduced server-side (LTTB for lines, min/max buckets for
+    bars, which become a WebGL envelope) before any point reaches the browser.
+    """
+    days = np.asarray(days)
+    values = np.asarray(values, dtype=np.float64)
+    budget = width_px * POINTS_PER_PX
+    if kind == "bar":
+        index = minmax(values, budget // 2)
+    else:
+        index = lttb(days, values, budget)
+    x = days_to_datetime64(days[index])
+    y = values[index]
+    webgl = len(days) > WEBGL_THRESHOLD
+    if kind == "bar" and not webgl:
+        trace = go.Bar(x=x, y=y, name=y_label)
+    elif webgl:
+        mode = "markers" if kind == "bar" else "lines"
+        trace = go.Scattergl(x=x, y=y, mode=mode, name=y_label, marker={"size": 3})
+    else:
+        trace = go.Scatter(x=x, y=y, mode="lines", name=y_label)
+    figure = go.Figure(trace)
+    subtitle = f" ({len(index):,} of {len(days):,} points)" if len(index) < len(days) else ""
+    figure.update_layout(title=title + subtitle, xaxis_title="date", yaxis_title=y_label)
+    return figure
+
+
+def lines_figure(days, series, title, y_label, width_px=CHART_WIDTH_PX):
+    """Several LTTB-reduced lines over shared days; NaN stretches are skipped per line."""
+    days = np.asarray(days)
+    budget = width_px * POINTS_PER_PX
+    figure = go.Figure()
+    for name, values in series.items():
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        line_days, values = days[valid], values[valid]
+        index = lttb(line_days, values, budget)
+        trace = go.Scattergl if len(line_days) > WEBGL_THRESHOLD else go.Scatter
+        figure.add_trace(trace(x=days_to_datetime64(line_days[index]), y=values[index], mode="lines", name=name))
+    figure.update_layout(title=title, xaxis_title="date", yaxis_title=y_label)
+    return figure
+
+
+def fan_figure(days, fan, quantiles, target, title):
+    """Outcome bands (outer quantiles shaded lightest) around the median path."""
+    x = days_to_datetime64(np.asarray(days))
+    figure = go.Figure()
+    n = len(quantiles)
+    for i in range(n // 2):
+        lo, hi = quantiles[i], quantiles[n - 1 - i]
+        figure.add_trace(go.Scatter(x=x, y=fan[i], mode="lines", line={"width": 0}, showlegend=False, hoverinfo="skip"))
+        figure.add_trace(go.Scatter(x=x, y=fan[n - 1 - i], mode="lines", line={"width": 0}, fill="tonexty",
+                                    fillcolor=f"rgba(0, 255, 225, {0.15 * (i + 1):.2f})", name=f"p{lo * 100:g}–p{hi * 100:g}"))
+    figure.add_trace(go.Scatter(x=x, y=fan[n // 2], mode="lines", name="median"))
+    figure.add_hline(y=target, line_dash="dash", annotation_text="target")
+    figure.update_layout(title=title, xaxis_title="date", yaxis_title="month P&L")
+    return figure
+
+
+def bar_figure(x, y, title, x_label, y_label):
+    """Plain categorical bar chart, built without plotly.express."""
+    figure = go.Figure(go.Bar(x=x, y=y))
+    figure.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label)
+    return figure
+
+
+def pie_figure(values, names, title):
+    figure = go.Figure(go.Pie(values=values, labels=names))
+    figure.update_layout(title=title)
+    return figure
+
+
+def calendar_figure(years, matrix, title):
+    """Years x day-of-year heatmap; red losses, green gains, blank where no entry."""
+    # A leap year's dates label the 366 columns, so ticks read as months;
+    # CalendarMatrix leaves Feb 29 blank in other years to keep them aligned.
+    x = np.datetime64("2000-01-01") + np.arange(366)
+    figure = go.Figure(go.Heatmap(
+        z=matrix, x=x, y=[str(year) for year in years], zmid=0, colorscale="RdYlGn", xgap=1, ygap=2,
+        hovertemplate="%{y}-%{x|%m-%d}: %{z:,.0f}<extra></extra>",
+    ))
+    figure.update_layout(title=title, xaxis={"tickformat": "%b", "dtick": "M1"}, yaxis={"autorange": "reversed"})
+    return figure
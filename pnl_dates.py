@@ -0,0 +1,119 @@
+import os
+from datetime import date
+
+import numpy as np
+
+# ----------------------------
+# ORDINALS
+# ----------------------------
+# Days and months are plain integers counted from 1970-01-01, which is also
+# the epoch numpy uses for datetime64[D] / datetime64[M]. Converting between
+# the two is therefore a reinterpretation, never a string parse.
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Month the fiscal year starts in; April for Indian accounts.
+FISCAL_YEAR_START = int(os.environ.get("PNL_FISCAL_START", "4"))
+# Reporting periods understood by ``period_bounds``.
+PERIODS = ("week", "month", "quarter", "ytd", "fiscal")
+
+
+def to_day(value):
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+def day_to_date(day):
+    return date.fromordinal(int(day) + EPOCH_ORDINAL)
+
+
+def to_month(value):
+    return (value.year - 1970) * 12 + value.month - 1
+
+
+def month_label(month):
+    year, month = divmod(int(month), 12)
+    return f"{1970 + year:04d}-{month + 1:02d}"
+
+
+def month_bounds(month):
+    """Half-open ``[first_day, next_month_first_day)`` day range of ``month``."""
+    month = int(month)
+    return int(month_first_day(month)), int(month_first_day(month + 1))
+
+
+def months_spanned(start, stop):
+    """How many months ``[start, stop)`` covers, counting partial months by their share of days."""
+    return _month_position(stop) - _month_position(start)
+
+
+def _month_position(day):
+    month = int(days_to_months([day])[0])
+    first, following = month_bounds(month)
+    return month + (int(day) - first) / (following - first)
+
+
+# ----------------------------
+# PERIODS
+# ----------------------------
+def period_bounds(period, today, fiscal_start=FISCAL_YEAR_START):
+    """Half-open day range of the ``PERIODS`` entry containing ``today``.
+
+    Week, month, quarter and fiscal year span the whole period (days still
+    ahead included); ``ytd`` runs from 1 January through today.
+    """
+    day, month = to_day(today), to_month(today)
+    if period == "week":
+        start = day - today.weekday()
+        return start, start + 7
+    if period == "month":
+        return month_bounds(month)
+    if period == "quarter":
+        first = month - month % 3
+        return month_bounds(first)[0], month_bounds(first + 3)[0]
+    if period == "ytd":
+        return month_bounds(month - month % 12)[0], day + 1
+    if period == "fiscal":
+        first = month - (month - (fiscal_start - 1)) % 12
+        return month_bounds(first)[0], month_bounds(first + 12)[0]
+    raise ValueError(f"Unknown period {period!r}; expected one of {PERIODS}")
+
+
+# ----------------------------
+# VECTORISED
+# ----------------------------
+def days_to_datetime64(days):
+    return np.asarray(days, dtype=np.int64).astype("datetime64[D]")
+
+
+def days_to_months(days):
+    return days_to_datetime64(days).astype("datetime64[M]").astype(np.int32)
+
+
+def month_first_day(months):
+    return np.asarray(months, dtype=np.int64).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+
+
+def range_slice(days, start, stop):
+    """Positions of ``start <= day < stop`` in a sorted day array, in O(log n)."""
+    lo = int(np.searchsorted(days, start, side="left"))
+    hi = int(np.searchsorted(days, stop, side="left"))
+    return slice(lo, hi)
+
+
+def month_slice(days, month):
+    return range_slice(days, *month_bounds(month))
+
+
+def month_offsets(days):
+    """Split a sorted day array into months.
+
+    Returns ``(months, offsets)`` where rows ``offsets[i]:offsets[i + 1]``
+    belong to ``months[i]``; ``offsets`` has one trailing element equal to
+    ``len(days)`` so it can be fed straight to ``np.add.reduceat``.
+    """
+    months = days_to_months(days)
+    if len(months) == 0:
+        return months, np.zeros(1, dtype=np.intp)
+    starts = np.flatnonzero(np.diff(months)) + 1
+    offsets = np.concatenate(([0], starts, [len(months)]))
+    return months[offsets[:-1]], offsets
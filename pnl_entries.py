@@ -0,0 +1,141 @@
+import numpy as np
+
+from pnl_dates import day_to_date
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+# Column name -> dtype: 28 bytes a row with every column present.
+ENTRY_DTYPES = {"id": np.int64, "revision": np.int64, "day": np.int32, "pnl": np.float64}
+INITIAL_CAPACITY = 64
+SECONDS_PER_DAY = 86_400
+
+
+# ----------------------------
+# RECORDS
+# ----------------------------
+class Entry:
+    """One entry, copied out of an ``EntryArrays`` row."""
+
+    __slots__ = ("id", "revision", "day", "pnl")
+
+    def __init__(self, id, revision, day, pnl):
+        self.id = id
+        self.revision = revision
+        self.day = day
+        self.pnl = pnl
+
+    @property
+    def date(self):
+        return day_to_date(self.day)
+
+    def __repr__(self):
+        return f"Entry(id={self.id}, revision={self.revision}, date={self.date}, pnl={self.pnl})"
+
+
+class EntryArrays:
+    """Entries as parallel typed columns instead of one object per row.
+
+    Each column is a NumPy array with spare capacity, so ``append`` is
+    amortised O(1). ``ids``, ``revisions``, ``days`` and ``pnl`` are views
+    of the filled rows, and ``frame`` wraps those same buffers in a
+    DataFrame; only the derived ``date`` column is materialised. Columns a
+    caller never asked for (say ids for a chart) are simply absent.
+    """
+
+    __slots__ = ("_columns", "_n", "_capacity")
+
+    def __init__(self, columns=tuple(ENTRY_DTYPES), capacity=INITIAL_CAPACITY):
+        self._columns = {name: np.empty(capacity, dtype=ENTRY_DTYPES[name]) for name in columns}
+        self._n = 0
+        # Kept apart from the columns: a container may have none.
+        self._capacity = capacity
+
+    @classmethod
+    def from_rows(cls, rows, columns=tuple(ENTRY_DTYPES)):
+        """From row tuples (e.g. a SQLite fetch) ordered like ``columns``."""
+        entries = cls(columns, len(rows))
+        if rows:
+            for name, values in zip(columns, zip(*rows)):
+                entries._columns[name][:] = values
+        entries._n = len(rows)
+        return entries
+
+    @classmethod
+    def from_arrays(cls, **arrays):
+        """Adopt equal-length arrays (cast to the column dtypes) as the columns."""
+        entries = cls(())
+        lengths = {len(values) for values in arrays.values()}
+        if len(lengths) > 1:
+            raise ValueError("Entry columns must all have the same length")
+        entries._columns = {name: np.asarray(values, dtype=ENTRY_DTYPES[name]) for name, values in arrays.items()}
+        entries._n = entries._capacity = lengths.pop() if lengths else 0
+        return entries
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        values = {name: column[i].item() for name, column in self._columns.items()}
+        return Entry(values.get("id"), values.get("revision"), values.get("day"), values.get("pnl"))
+
+    def __iter__(self):
+        return (self[i] for i in range(self._n))
+
+    @property
+    def columns(self):
+        return tuple(self._columns)
+
+    @property
+    def nbytes(self):
+        return sum(column[:self._n].nbytes for column in self._columns.values())
+
+    def column(self, name):
+        return self._columns[name][:self._n]
+
+    @property
+    def ids(self):
+        return self.column("id")
+
+    @property
+    def revisions(self):
+        return self.column("revision")
+
+    @property
+    def days(self):
+        return self.column("day")
+
+    @property
+    def pnl(self):
+        return self.column("pnl")
+
+    def append(self, **values):
+        if set(values) != set(self._columns):
+            raise ValueError(f"Expected values for {sorted(self._columns)}")
+        if self._n == self._capacity:
+            self._grow(max(INITIAL_CAPACITY, 2 * self._n))
+        for name, value in values.items():
+            self._columns[name][self._n] = value
+        self._n += 1
+
+    def frame(self, columns=None):
+        """A DataFrame over these columns (``date`` derives from ``day``), sharing their memory."""
+        import pandas as pd
+        columns = list(columns or [("date" if name == "day" else name) for name in self._columns])
+        data = {name: self.column(name) for name in columns if name != "date"}
+        if "date" in columns:
+            # pandas stores datetime64[D] as seconds anyway; building [s]
+            # here is one pass instead of two and is wrapped as is.
+            data["date"] = (self.days.astype(np.int64) * SECONDS_PER_DAY).view("datetime64[s]")
+        return pd.DataFrame(data, columns=columns, copy=False)
+
+    def _grow(self, capacity):
+        for name, old in self._columns.items():
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._n] = old[:self._n]
+            self._columns[name] = new
+        self._capacity = capacity
@@ -0,0 +1,153 @@
+import os
+
+import numpy as np
+
+from pnl_store import DEFAULT_ACCOUNT
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+CHUNK_ROWS = 50_000
+
+# Lower-cased header aliases seen in our own exports and common broker files.
+DATE_ALIASES = ("date", "trade date", "trade_date", "tradedate", "day", "settlement date")
+PNL_ALIASES = (
+    "pnl", "p&l", "profit/loss", "profit/loss (₹)", "net p&l", "realized p&l",
+    "realised p&l", "net pnl", "net_pnl", "net amount", "net total",
+)
+
+MODE_HISTORY = "history"
+MODE_CONTRACT_NOTE = "contract_note"
+MODE_FILLS = "fills"
+
+
+class ImportResult:
+    __slots__ = ("rows_read", "rows_rejected", "duplicates", "skipped_existing", "inserted", "fills", "days", "pnl")
+
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_rejected = 0
+        self.duplicates = 0
+        self.skipped_existing = 0
+        self.inserted = 0
+        self.fills = 0
+        # The rows actually written, for folding into running aggregates.
+        self.days = np.empty(0, dtype=np.int32)
+        self.pnl = np.empty(0, dtype=np.float64)
+
+
+# ----------------------------
+# READERS
+# ----------------------------
+def read_chunks(source, name, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrame chunks from a CSV or Excel file-like object."""
+    # pandas is only loaded once a file is actually imported.
+    import pandas as pd
+    ext = os.path.splitext(name)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        yield from _excel_chunks(source, chunk_rows)
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_rows, dtype=str, skipinitialspace=True)
+
+
+def _excel_chunks(source, chunk_rows):
+    import pandas as pd
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:
+        raise ImportError("Excel import needs openpyxl: pip install openpyxl") from exc
+    # read_only streams rows from the sheet XML instead of building the workbook.
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell) if cell is not None else "" for cell in next(rows, ())]
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_rows:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+# ----------------------------
+# PARSING
+# ----------------------------
+def _find_column(columns, aliases):
+    lookup = {str(c).strip().lower(): c for c in columns}
+    for alias in aliases:
+        if alias in lookup:
+            return lookup[alias]
+    raise ValueError(f"No column matching any of: {', '.join(aliases)}")
+
+
+def parse_chunk(chunk, dayfirst=False):
+    """Validate one chunk into ``(days, pnl, rejected)`` NumPy arrays."""
+    import pandas as pd
+    date_col = _find_column(chunk.columns, DATE_ALIASES)
+    pnl_col = _find_column(chunk.columns, PNL_ALIASES)
+    dates = pd.to_datetime(chunk[date_col], errors="coerce", dayfirst=dayfirst)
+    pnl = chunk[pnl_col]
+    if not pd.api.types.is_numeric_dtype(pnl):
+        pnl = pnl.astype(str).str.replace(r"[,₹\s]", "", regex=True).str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+    pnl = pd.to_numeric(pnl, errors="coerce")
+    valid = dates.notna().to_numpy() & np.isfinite(pnl.to_numpy(dtype=np.float64, na_value=np.nan))
+    days = dates[valid].to_numpy().astype("datetime64[D]").astype(np.int32)
+    values = pnl[valid].to_numpy(dtype=np.float64)
+    return days, values, int((~valid).sum())
+
+
+def _reduce_by_day(days, pnl, mode):
+    """Collapse to one row per day: last value for histories, sum for contract notes."""
+    if mode == MODE_CONTRACT_NOTE:
+        unique, inverse = np.unique(days, return_inverse=True)
+        return unique, np.bincount(inverse, weights=pnl, minlength=len(unique))
+    # np.unique keeps the first occurrence, so search the reversed arrays for "last".
+    unique, index = np.unique(days[::-1], return_index=True)
+    return unique, pnl[::-1][index]
+
+
+# ----------------------------
+# IMPORT
+# ----------------------------
+def import_file(store, source, name, mode=MODE_HISTORY, dayfirst=False,
+                skip_existing=True, chunk_rows=CHUNK_ROWS, progress=None, account=DEFAULT_ACCOUNT):
+    """Stream ``source`` into ``account`` in one batched transaction.
+
+    Each chunk is reduced to one row per day before the next chunk is read,
+    so memory is bounded by the number of distinct days, not file rows.
+    ``progress`` is called with a fraction in ``[0, 1]`` after every chunk.
+    """
+    if mode == MODE_FILLS:
+        # Imported here: pnl_trades builds on this module's readers.
+        from pnl_trades import import_fills
+        return import_fills(store, source, name, dayfirst=dayfirst, skip_existing=skip_existing,
+                            chunk_rows=chunk_rows, progress=progress, account=account)
+    result = ImportResult()
+    total_bytes = getattr(source, "size", None)
+    days = np.empty(0, dtype=np.int32)
+    pnl = np.empty(0, dtype=np.float64)
+    for chunk in read_chunks(source, name, chunk_rows):
+        chunk_days, chunk_pnl, rejected = parse_chunk(chunk, dayfirst=dayfirst)
+        result.rows_read += len(chunk)
+        result.rows_rejected += rejected
+        days, pnl = _reduce_by_day(np.concatenate((days, chunk_days)), np.concatenate((pnl, chunk_pnl)), mode)
+        if progress is not None and total_bytes and hasattr(source, "tell"):
+            progress(min(1.0, source.tell() / total_bytes))
+    result.duplicates = result.rows_read - result.rows_rejected - len(days)
+
+    if skip_existing and len(days):
+        existing = store.existing_days(int(days[0]), int(days[-1]) + 1, account)
+        keep = ~np.isin(days, existing)
+        result.skipped_existing = int((~keep).sum())
+        days, pnl = days[keep], pnl[keep]
+
+    if len(days):
+        result.inserted = store.add_entries(days, pnl, account)
+        result.days, result.pnl = days, pnl
+    if progress is not None:
+        progress(1.0)
+    return result
@@ -0,0 +1,201 @@
+import numpy as np
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+# Spare days kept past the last day, so a month of new entries does not
+# regrow the ledger every day.
+HEADROOM_DAYS = 366
+
+
+# ----------------------------
+# FENWICK TREE
+# ----------------------------
+class FenwickTree:
+    """Prefix sums over a fixed-length array with O(log n) point updates.
+
+    Node ``i`` (1-based) holds the sum of the ``i & -i`` values ending at
+    position ``i``, so an update touches one node per set bit it climbs
+    through and a prefix query one node per set bit of its length.
+    """
+
+    __slots__ = ("_tree",)
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        csum = np.concatenate(([0.0], np.cumsum(values)))
+        i = np.arange(1, len(values) + 1)
+        # Built from one cumulative sum instead of n updates.
+        self._tree = csum[i] - csum[i - (i & -i)]
+
+    def __len__(self):
+        return len(self._tree)
+
+    def add(self, i, delta):
+        """Add ``delta`` to value ``i``."""
+        tree, n = self._tree, len(self._tree)
+        i += 1
+        while i <= n:
+            tree[i - 1] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        """Sum of the first ``i`` values."""
+        tree, total = self._tree, 0.0
+        i = min(max(int(i), 0), len(tree))
+        while i > 0:
+            total += tree[i - 1]
+            i &= i - 1
+        return float(total)
+
+    def prefixes(self, positions):
+        """``prefix`` of every element of ``positions``, one vectorised step per tree level."""
+        i = np.clip(np.asarray(positions, dtype=np.int64), 0, len(self._tree))
+        totals = np.zeros(len(i), dtype=np.float64)
+        live = i > 0
+        while live.any():
+            totals[live] += self._tree[i[live] - 1]
+            i &= i - 1
+            live = i > 0
+        return totals
+
+
+# ----------------------------
+# DAY LEDGER
+# ----------------------------
+class DayLedger:
+    """One account's daily P&L and entry counts on a dense day index, with running totals.
+
+    Slot ``i`` is day ``first_day + i``. An entry, edit or delete is a
+    single ``add`` of its P&L delta, after which the running total at any
+    day and the sum over any day range are O(log n) queries: nothing is
+    re-summed after a correction in the middle of the history.
+    """
+
+    def __init__(self):
+        self.first_day = None
+        self._daily = np.empty(0, dtype=np.float64)
+        self._entries = np.empty(0, dtype=np.int64)
+        self._tree = FenwickTree(self._daily)
+
+    @classmethod
+    def from_arrays(cls, days, pnl):
+        ledger = cls()
+        days = np.asarray(days, dtype=np.int64)
+        if len(days):
+            first = int(days.min())
+            size = int(days.max()) - first + 1 + HEADROOM_DAYS
+            ledger._reset(first, np.bincount(days - first, weights=pnl, minlength=size),
+                          np.bincount(days - first, minlength=size))
+        return ledger
+
+    @property
+    def last_day(self):
+        """Last day the ledger spans (entries or not), or None while empty."""
+        return None if self.first_day is None else self.first_day + len(self._daily) - 1
+
+    def add(self, day, pnl, entries=1):
+        """Add ``pnl`` to a day that gains ``entries`` entries (negative for deletes, 0 for edits)."""
+        day = int(day)
+        self._cover(day)
+        self._daily[day - self.first_day] += pnl
+        self._entries[day - self.first_day] += entries
+        self._tree.add(day - self.first_day, float(pnl))
+
+    def total(self, start=None, stop=None):
+        """Sum over ``start <= day < stop``; either bound may be None (open)."""
+        if self.first_day is None:
+            return 0.0
+        hi = len(self._daily) if stop is None else int(stop) - self.first_day
+        lo = 0 if start is None else int(start) - self.first_day
+        return self._tree.prefix(hi) - self._tree.prefix(lo) if hi > lo else 0.0
+
+    def running(self, days):
+        """Running total at the end of each of ``days`` (an array)."""
+        days = np.asarray(days, dtype=np.int64)
+        if self.first_day is None:
+            return np.zeros(len(days), dtype=np.float64)
+        return self._tree.prefixes(days - self.first_day + 1)
+
+    def range_index(self):
+        """Freeze the ledger into a ``RangeIndex`` (one vectorised pass)."""
+        return RangeIndex(self.first_day, self._daily, self._entries)
+
+    def _cover(self, day):
+        if self.first_day is None:
+            self._reset(day, np.zeros(HEADROOM_DAYS), np.zeros(HEADROOM_DAYS))
+        elif day < self.first_day:
+            pad = self.first_day - day
+            self._reset(day, np.concatenate((np.zeros(pad), self._daily)), np.concatenate((np.zeros(pad), self._entries)))
+        elif day > self.last_day:
+            grow = max(day - self.last_day, len(self._daily), HEADROOM_DAYS)
+            self._reset(self.first_day, np.concatenate((self._daily, np.zeros(grow))), np.concatenate((self._entries, np.zeros(grow))))
+
+    def _reset(self, first_day, daily, entries):
+        self.first_day = first_day
+        self._daily = np.asarray(daily, dtype=np.float64)
+        self._entries = np.asarray(entries, dtype=np.int64)
+        self._tree = FenwickTree(self._daily)
+
+
+# ----------------------------
+# RANGE INDEX
+# ----------------------------
+class RangeStats:
+    __slots__ = ("start", "stop", "total", "entries", "days", "wins")
+
+    def __init__(self, start, stop, total, entries, days, wins):
+        self.start = start
+        self.stop = stop
+        self.total = total
+        self.entries = entries
+        self.days = days
+        self.wins = wins
+
+    @property
+    def win_rate(self):
+        """Share of trading days (days with entries) that closed positive."""
+        return self.wins / self.days if self.days else float("nan")
+
+    @property
+    def average(self):
+        return self.total / self.days if self.days else 0.0
+
+
+class RangeIndex:
+    """Prefix sums and counts over a dense day index, frozen at one revision.
+
+    Every statistic over ``start <= day < stop`` is the difference of two
+    prefix entries, so any range (a week, a quarter, ten years) costs O(1)
+    and switching between ranges never touches the entries themselves.
+    Build one per revision from ``DayLedger.range_index``.
+    """
+
+    __slots__ = ("first_day", "_pnl", "_entries", "_days", "_wins")
+
+    def __init__(self, first_day, daily, entries):
+        self.first_day = 0 if first_day is None else first_day
+        traded = entries > 0
+        # Each prefix array has a leading zero: [i] covers the first i days.
+        self._pnl = _prefix(daily)
+        self._entries = _prefix(entries)
+        self._days = _prefix(traded)
+        self._wins = _prefix(traded & (daily > 0))
+
+    @property
+    def nbytes(self):
+        return self._pnl.nbytes + self._entries.nbytes + self._days.nbytes + self._wins.nbytes
+
+    def stats(self, start, stop):
+        """``RangeStats`` for ``start <= day < stop``."""
+        lo, hi = self._position(start), self._position(stop)
+        hi = max(lo, hi)
+        return RangeStats(int(start), int(stop), float(self._pnl[hi] - self._pnl[lo]), int(self._entries[hi] - self._entries[lo]),
+                          int(self._days[hi] - self._days[lo]), int(self._wins[hi] - self._wins[lo]))
+
+    def _position(self, day):
+        return min(max(int(day) - self.first_day, 0), len(self._pnl) - 1)
+
+
+def _prefix(values):
+    return np.concatenate(([0], np.cumsum(values)))
@@ -0,0 +1,274 @@
+"""Live intraday P&L from a stream of events, coalesced into periodic snapshots.
+
+Events are JSON lines, one per P&L change:
+
+    {"account": 1, "pnl": -12.5, "ts": 1760000000.0}
+
+``account`` defaults to the main account and ``ts`` (epoch seconds, whose
+local date is the trading day) to the time of receipt. Set ``PNL_LIVE`` and the
+dashboards listen for them on a background asyncio loop:
+
+    PNL_LIVE=tcp://127.0.0.1:8765       # newline-delimited JSON over TCP
+    PNL_LIVE=unix:///tmp/pnl.sock       # same over a unix socket
+    PNL_LIVE=file:///var/log/pnl.jsonl  # tail a file another process appends to
+
+A simulator stands in for the broker:
+
+    python pnl_live.py tcp://127.0.0.1:8765 --rate 5000 --accounts 1,2
+
+Each event only adds into a running total. Once per ``PNL_LIVE_INTERVAL``
+seconds the totals that changed are published as one immutable snapshot,
+and the HUD re-reads that on the same interval, so a burst of thousands of
+events costs each session one rerun per interval, not one per event.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from datetime import date
+from urllib.parse import urlparse
+
+import numpy as np
+
+from pnl_dates import to_day
+from pnl_store import DEFAULT_ACCOUNT
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+LIVE_SOURCE = os.environ.get("PNL_LIVE")
+SNAPSHOT_INTERVAL = float(os.environ.get("PNL_LIVE_INTERVAL", "1.0"))
+TAIL_POLL = 0.1
+
+logger = logging.getLogger("pnl.live")
+
+
+# ----------------------------
+# SNAPSHOTS
+# ----------------------------
+class LiveTotal:
+    __slots__ = ("pnl", "events", "last_ts")
+
+    def __init__(self, pnl=0.0, events=0, last_ts=None):
+        self.pnl = pnl
+        self.events = events
+        self.last_ts = last_ts
+
+
+class LiveSnapshot:
+    """Totals per ``(account, day)`` as of ``taken``; never mutated once published."""
+
+    __slots__ = ("seq", "taken", "totals", "events", "rejected")
+
+    def __init__(self, seq=0, taken=None, totals=None, events=0, rejected=0):
+        self.seq = seq
+        self.taken = taken
+        self.totals = totals or {}
+        self.events = events
+        self.rejected = rejected
+
+    def get(self, account, day):
+        return self.totals.get((int(account), int(day)))
+
+
+EMPTY_SNAPSHOT = LiveSnapshot()
+
+
+# ----------------------------
+# FEED
+# ----------------------------
+class LiveFeed:
+    """Consumes events from ``source`` on a daemon thread running an asyncio loop.
+
+    The loop is the only writer of the running totals apart from ``book``;
+    readers only ever see ``snapshot``, which is swapped in whole.
+    """
+
+    def __init__(self, source, interval=SNAPSHOT_INTERVAL):
+        self.source = urlparse(source)
+        if self.source.scheme not in ("tcp", "unix", "file"):
+            raise ValueError(f"Unsupported live source {source!r}; use tcp://, unix:// or file://")
+        self.interval = interval
+        self.snapshot = EMPTY_SNAPSHOT
+        self.error = None
+        self._totals = {}
+        self._dirty = False
+        self._events = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="pnl-live", daemon=True)
+        self._thread.start()
+        return self
+
+    def book(self, account, day, amount):
+        """Take ``amount`` out of the live total once it has been written as an entry."""
+        with self._lock:
+            total = self._totals.get((int(account), int(day)))
+            if total is not None:
+                total.pnl -= amount
+                self._dirty = True
+        self._publish()
+
+    def ingest(self, line):
+        """Fold one JSON event line into the running totals."""
+        try:
+            event = json.loads(line)
+            pnl = float(event["pnl"])
+            if not math.isfinite(pnl):
+                raise ValueError("non-finite pnl")
+            ts = float(event.get("ts") or time.time())
+            key = (int(event.get("account", DEFAULT_ACCOUNT)), to_day(date.fromtimestamp(ts)))
+        except (ValueError, KeyError, TypeError, AttributeError, OverflowError, OSError):
+            with self._lock:
+                self._rejected += 1
+            return
+        with self._lock:
+            total = self._totals.get(key)
+            if total is None:
+                total = self._totals[key] = LiveTotal()
+            total.pnl += pnl
+            total.events += 1
+            total.last_ts = ts
+            self._events += 1
+            self._dirty = True
+
+    def _publish(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            totals = {key: LiveTotal(t.pnl, t.events, t.last_ts) for key, t in self._totals.items()}
+            events, rejected = self._events, self._rejected
+            self._dirty = False
+        self.snapshot = LiveSnapshot(self.snapshot.seq + 1, time.time(), totals, events, rejected)
+
+    def _run(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as exc:  # surfaced in the HUD instead of dying silently
+            logger.exception("Live feed stopped")
+            self.error = f"{type(exc).__name__}: {exc}"
+
+    async def _main(self):
+        consumer = {"tcp": self._serve_tcp, "unix": self._serve_unix, "file": self._tail}[self.source.scheme]
+        await asyncio.gather(consumer(), self._ticker())
+
+    async def _ticker(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self._publish()
+
+    async def _handle(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                self.ingest(line)
+        finally:
+            writer.close()
+
+    async def _serve_tcp(self):
+        server = await asyncio.start_server(self._handle, self.source.hostname or "127.0.0.1", self.source.port)
+        async with server:
+            await server.serve_forever()
+
+    async def _serve_unix(self):
+        server = await asyncio.start_unix_server(self._handle, self.source.path)
+        async with server:
+            await server.serve_forever()
+
+    async def _tail(self):
+        path = self.source.path
+        while not os.path.exists(path):
+            await asyncio.sleep(TAIL_POLL)
+        with open(path, "rb") as fh:
+            # Only events appended from now on; earlier lines are history.
+            fh.seek(0, os.SEEK_END)
+            partial = b""
+            while True:
+                chunk = fh.read()
+                if not chunk:
+                    if os.path.getsize(path) < fh.tell():
+                        fh.seek(0)  # truncated or rotated in place
+                        partial = b""
+                    await asyncio.sleep(TAIL_POLL)
+                    continue
+                lines = (partial + chunk).split(b"\n")
+                partial = lines.pop()
+                for line in lines:
+                    if line.strip():
+                        self.ingest(line)
+
+
+# ----------------------------
+# SIMULATOR
+# ----------------------------
+async def simulate(target, rate, accounts, seconds=None, seed=0):
+    """Send ``rate`` random-walk P&L events per second to ``target`` (a PNL_LIVE URL)."""
+    source = urlparse(target)
+    rng = np.random.default_rng(seed)
+    if source.scheme == "tcp":
+        _, writer = await asyncio.open_connection(source.hostname or "127.0.0.1", source.port)
+        send = writer.write
+    elif source.scheme == "unix":
+        _, writer = await asyncio.open_unix_connection(source.path)
+        send = writer.write
+    elif source.scheme == "file":
+        writer = None
+        fh = open(source.path, "ab")
+        send = fh.write
+    else:
+        raise ValueError(f"Unsupported target {target!r}")
+    # Events go out in 10 ms batches, the way a busy feed arrives in bursts.
+    tick = 0.01
+    per_tick = max(1, int(rate * tick))
+    started = time.monotonic()
+    sent = 0
+    try:
+        while seconds is None or time.monotonic() - started < seconds:
+            now = time.time()
+            picks = rng.integers(0, len(accounts), per_tick)
+            moves = rng.normal(0.0, 25.0, per_tick).round(2)
+            send(b"".join(json.dumps({"account": accounts[i], "pnl": float(m), "ts": now}).encode() + b"\n"
+                          for i, m in zip(picks, moves)))
+            if writer is not None:
+                await writer.drain()
+            else:
+                fh.flush()
+            sent += per_tick
+            await asyncio.sleep(max(0.0, started + sent / rate - time.monotonic()))
+    finally:
+        if writer is not None:
+            writer.close()
+        else:
+            fh.close()
+    return sent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a live P&L feed for the dashboards.")
+    parser.add_argument("target", nargs="?", default=LIVE_SOURCE or "tcp://127.0.0.1:8765",
+                        help="tcp://host:port, unix:///path or file:///path (default: PNL_LIVE)")
+    parser.add_argument("--rate", type=float, default=1000, help="events per second (default: 1000)")
+    parser.add_argument("--accounts", default=str(DEFAULT_ACCOUNT), help="comma-separated account ids (default: 1)")
+    parser.add_argument("--seconds", type=float, help="stop after this long (default: run until interrupted)")
+    args = parser.parse_args(argv)
+    accounts = [int(a) for a in args.accounts.split(",")]
+    started = time.perf_counter()
+    try:
+        sent = asyncio.run(simulate(args.target, args.rate, accounts, args.seconds))
+    except KeyboardInterrupt:
+        return 0
+    except OSError as exc:
+        parser.error(f"cannot reach {args.target}: {exc}")
+    print(f"Sent {sent:,} events in {time.perf_counter() - started:.1f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import numpy as np
+
+from pnl_dates import months_spanned
+from pnl_store import DEFAULT_ACCOUNT
+
+
+# ----------------------------
+# ACCOUNTS
+# ----------------------------
+class Account:
+    __slots__ = ("id", "name", "capital", "leverage", "target_percent", "revision")
+
+    def __init__(self, id, name, capital, leverage, target_percent, revision=0):
+        self.id = id
+        self.name = name
+        self.capital = capital
+        self.leverage = leverage
+        self.target_percent = target_percent
+        self.revision = revision
+
+    @property
+    def exposure(self):
+        return self.capital * self.leverage
+
+    @property
+    def monthly_target(self):
+        return self.exposure * self.target_percent / 100
+
+
+class Portfolio:
+    """Every account's parameters as parallel NumPy columns.
+
+    Target math for the overview runs once over these arrays instead of
+    once per account, so hundreds of accounts cost a handful of vector ops.
+    """
+
+    def __init__(self, rows):
+        ids, names, capital, leverage, target_percent, revisions = zip(*rows) if rows else ((),) * 6
+        self.ids = np.array(ids, dtype=np.int64)
+        self.names = list(names)
+        self.capital = np.array(capital, dtype=np.float64)
+        self.leverage = np.array(leverage, dtype=np.float64)
+        self.target_percent = np.array(target_percent, dtype=np.float64)
+        self.revisions = np.array(revisions, dtype=np.int64)
+        self.exposure = self.capital * self.leverage
+        self.monthly_target = self.exposure * self.target_percent / 100
+        self._index = {account: i for i, account in enumerate(ids)}
+
+    @classmethod
+    def from_store(cls, store):
+        return cls(store.accounts())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, account):
+        return account in self._index
+
+    def name(self, account):
+        return self.names[self._index[account]]
+
+    def account(self, account):
+        i = self._index.get(account, self._index.get(DEFAULT_ACCOUNT, 0))
+        return Account(int(self.ids[i]), self.names[i], float(self.capital[i]),
+                       float(self.leverage[i]), float(self.target_percent[i]), int(self.revisions[i]))
+
+    def align(self, accounts, values):
+        """Scatter per-account ``values`` onto this portfolio's order (0 where absent)."""
+        out = np.zeros(len(self), dtype=np.float64)
+        position = np.searchsorted(self.ids, accounts)
+        known = (position < len(self)) & (self.ids[np.minimum(position, len(self) - 1)] == accounts)
+        out[position[known]] = np.asarray(values, dtype=np.float64)[known]
+        return out
+
+
+# ----------------------------
+# TARGET MATH
+# ----------------------------
+class Metrics:
+    __slots__ = ("total_pnl", "progress_percent", "days_left", "remaining", "daily_needed")
+
+    def __init__(self, total_pnl, progress_percent, days_left, remaining, daily_needed):
+        self.total_pnl = total_pnl
+        self.progress_percent = progress_percent
+        self.days_left = days_left
+        self.remaining = remaining
+        self.daily_needed = daily_needed
+
+
+def compute_metrics(total_pnl, monthly_target, today, last_day):
+    """Target progress for one account (scalars) or many (arrays) in one pass."""
+    return _metrics(total_pnl, monthly_target, last_day - today.day + 1)
+
+
+def range_metrics(total_pnl, monthly_target, start, stop, today_day):
+    """Target progress over days ``[start, stop)``, the monthly target prorated by the months it spans."""
+    target = np.asarray(monthly_target, dtype=np.float64) * months_spanned(start, stop)
+    return _metrics(total_pnl, target, max(0, stop - max(today_day, start)))
+
+
+def _metrics(total_pnl, target, days_left):
+    total_pnl = np.asarray(total_pnl, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        progress_percent = np.where(target > 0, total_pnl / target * 100, 100.0)
+    progress_percent = np.minimum(100, progress_percent)
+    remaining = target - total_pnl
+    daily_needed = remaining / days_left if days_left > 0 else np.zeros_like(remaining)
+    # [()] turns 0-d results back into plain scalars for the single-account HUD.
+    return Metrics(total_pnl[()], progress_percent[()], days_left, remaining[()], daily_needed[()])
+
+
+def overview(portfolio, totals, metrics):
+    """One row per account for the sortable portfolio table."""
+    import pandas as pd
+    return pd.DataFrame({
+        "Account": portfolio.names,
+        "Capital": portfolio.capital,
+        "Leverage": portfolio.leverage,
+        "Exposure": portfolio.exposure,
+        "Monthly Target": portfolio.monthly_target,
+        "Current P&L": totals,
+        "Progress %": metrics.progress_percent,
+        "Remaining": metrics.remaining,
+        "Daily Needed": metrics.daily_needed,
+    })
@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+# Set PNL_METRICS_PATH to have every rerun rewrite a Prometheus text file
+# (e.g. for node_exporter's textfile collector).
+METRICS_PATH = os.environ.get("PNL_METRICS_PATH")
+WINDOW = 500
+QUANTILES = (0.5, 0.9, 0.99)
+
+logger = logging.getLogger("pnl.profiler")
+
+
+# ----------------------------
+# PER-RUN TIMINGS
+# ----------------------------
+class RunTimings:
+    """Wall time per section (and per figure build) for one app or fragment run.
+
+    Sections of a fragment run are recorded as ``<scope>:<section>`` so they
+    stay apart from the same section timed in another fragment.
+    """
+
+    def __init__(self, scope="app"):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.sections = {}
+
+    @contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed(self, name, fn):
+        with self.section(name):
+            return fn()
+
+    def add(self, name, seconds):
+        if self.scope != "app":
+            name = f"{self.scope}:{name}"
+        self.sections[name] = self.sections.get(name, 0.0) + seconds
+
+
+# ----------------------------
+# PROFILER
+# ----------------------------
+class RerunProfiler:
+    """Keeps the last ``window`` samples per section and reports percentiles."""
+
+    def __init__(self, window=WINDOW, metrics_path=METRICS_PATH):
+        self.window = window
+        self.metrics_path = metrics_path
+        self.runs = 0
+        self._samples = {}
+        self._sums = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def start_run(self, scope="app"):
+        return RunTimings(scope)
+
+    def finish_run(self, timings):
+        timings.add("total", time.perf_counter() - timings.started)
+        with self._lock:
+            self.runs += 1
+            for name, seconds in timings.sections.items():
+                samples = self._samples.get(name)
+                if samples is None:
+                    samples = self._samples[name] = deque(maxlen=self.window)
+                samples.append(seconds)
+                self._sums[name] = self._sums.get(name, 0.0) + seconds
+                self._counts[name] = self._counts.get(name, 0) + 1
+        logger.info(json.dumps({"event": "rerun", "scope": timings.scope, "run": self.runs,
+                                "sections_ms": {k: round(v * 1000, 3) for k, v in timings.sections.items()}}))
+        if self.metrics_path:
+            try:
+                self.write_prometheus(self.metrics_path)
+            except OSError as exc:
+                logger.warning("Could not write %s: %s", self.metrics_path, exc)
+
+    def summary(self):
+        """Rows of section, count and p50/p90/p99 in milliseconds, slowest first."""
+        with self._lock:
+            snapshot = {name: np.fromiter(samples, dtype=np.float64) for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+        rows = []
+        for name, samples in snapshot.items():
+            p50, p90, p99 = np.quantile(samples, QUANTILES) * 1000
+            rows.append({"section": name, "runs": counts[name], "p50_ms": p50, "p90_ms": p90, "p99_ms": p99})
+        rows.sort(key=lambda row: row["p50_ms"], reverse=True)
+        return rows
+
+    def prometheus_text(self):
+        with self._lock:
+            snapshot = {name: np.fromiter(samples, dtype=np.float64) for name, samples in self._samples.items()}
+            sums, counts = dict(self._sums), dict(self._counts)
+        lines = [
+            "# HELP pnl_rerun_section_seconds Dashboard rerun wall time per section.",
+            "# TYPE pnl_rerun_section_seconds summary",
+        ]
+        for name in sorted(snapshot):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            for q, value in zip(QUANTILES, np.quantile(snapshot[name], QUANTILES)):
+                lines.append(f'pnl_rerun_section_seconds{{section="{label}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'pnl_rerun_section_seconds_sum{{section="{label}"}} {sums[name]:.6f}')
+            lines.append(f'pnl_rerun_section_seconds_count{{section="{label}"}} {counts[name]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Write-then-rename so a scraper never reads a half-written file.
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as fh:
+            fh.write(self.prometheus_text())
+        os.replace(tmp, path)
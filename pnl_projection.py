@@ -0,0 +1,71 @@
+import numpy as np
+
+from pnl_dates import days_to_datetime64
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+N_PATHS = 100_000
+# Recent trading days to resample from; older regimes say little about this month.
+LOOKBACK_DAYS = 250
+MIN_HISTORY = 20
+# Draws per batch, so memory stays flat however many paths are asked for.
+BATCH_CELLS = 4_000_000
+# The fan chart only needs its quantiles, which settle long before N_PATHS.
+FAN_PATHS = 20_000
+FAN_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+# ----------------------------
+# PROJECTION
+# ----------------------------
+class Projection:
+    __slots__ = ("probability", "paths", "session_days", "fan", "median_final")
+
+    def __init__(self, probability, paths, session_days, fan, median_final):
+        self.probability = probability
+        self.paths = paths
+        self.session_days = session_days
+        self.fan = fan
+        self.median_final = median_final
+
+
+def remaining_sessions(today_day, month_stop, traded_today):
+    """Weekday ordinals left in the month, counting today only if it has no entry yet."""
+    start = today_day + 1 if traded_today else today_day
+    days = np.arange(start, month_stop, dtype=np.int64)
+    return days[np.is_busday(days_to_datetime64(days))]
+
+
+def simulate(daily_pnl, current_total, target, session_days, n_paths=N_PATHS, seed=0):
+    """Bootstrap the rest of the month ``n_paths`` times from ``daily_pnl``.
+
+    Each path draws one historical day per remaining session with
+    replacement. Paths run in batches of whole NumPy matrices; only the
+    first ``FAN_PATHS`` keep their trajectories for the fan chart.
+    """
+    daily_pnl = np.asarray(daily_pnl, dtype=np.float64)[-LOOKBACK_DAYS:]
+    if len(daily_pnl) < MIN_HISTORY:
+        return None
+    sessions = len(session_days)
+    if sessions == 0:
+        hit = float(current_total >= target)
+        return Projection(hit, n_paths, session_days, np.full((len(FAN_QUANTILES), 1), current_total), current_total)
+
+    rng = np.random.default_rng(seed)
+    batch = max(1, BATCH_CELLS // sessions)
+    hits = 0
+    finals = np.empty(n_paths, dtype=np.float64)
+    fan = None
+    for start in range(0, n_paths, batch):
+        n = min(batch, n_paths - start)
+        paths = daily_pnl[rng.integers(0, len(daily_pnl), size=(n, sessions))]
+        np.cumsum(paths, axis=1, out=paths)
+        paths += current_total
+        finals[start:start + n] = paths[:, -1]
+        hits += int(np.count_nonzero(paths[:, -1] >= target))
+        if fan is None:
+            fan = np.quantile(paths[:FAN_PATHS], FAN_QUANTILES, axis=0)
+    # Every band starts from today's actual total.
+    fan = np.hstack((np.full((len(FAN_QUANTILES), 1), current_total), fan))
+    return Projection(hits / n_paths, n_paths, session_days, fan, float(np.median(finals)))
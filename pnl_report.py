@@ -0,0 +1,333 @@
+"""Headless month-end reports for many accounts, rendered in parallel.
+
+Uses the same store, aggregates, risk and target math as the dashboards:
+
+    python pnl_report.py                                   # last month, all accounts, HTML
+    python pnl_report.py --months 2025-01:2025-12 --formats html,pdf
+    python pnl_report.py --accounts Main,7 --months 2026-09 --workers 8
+
+Each account is one task in a process pool: it loads the account's history
+once and writes every requested month and format straight to
+``<out>/<id>-<account>/<YYYY-MM>.<format>``. Finished files are recorded in
+``<out>/manifest.jsonl`` as they land, so an interrupted run resumes where
+it stopped, and reports are redone only for accounts whose data has changed
+since (``--force`` redoes everything). PNG and PDF output need the optional
+``kaleido`` package.
+"""
+import argparse
+import calendar
+import copy
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+from pnl_aggregates import RunningAggregates
+from pnl_charts import CHART_WIDTH_PX, POINTS_PER_PX, lttb
+from pnl_dates import days_to_datetime64, month_bounds, month_label, range_slice, to_day, to_month
+from pnl_portfolio import Account, compute_metrics
+from pnl_projection import remaining_sessions, simulate
+from pnl_risk import RiskState
+from pnl_store import DB_PATH, PnLStore
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+FORMATS = ("html", "png", "pdf")
+MANIFEST = "manifest.jsonl"
+IMAGE_SIZE = (1200, 1400)
+
+
+def parse_month(text):
+    """``YYYY-MM`` as a month ordinal; ``ValueError`` for anything else."""
+    try:
+        year, month = (int(part) for part in text.strip().split("-"))
+    except ValueError:
+        raise ValueError(f"bad month {text.strip()!r}: expected YYYY-MM") from None
+    if not 1 <= month <= 12:
+        raise ValueError(f"bad month {text.strip()!r}: month must be 01-12")
+    return (year - 1970) * 12 + month - 1
+
+
+def parse_months(spec, today):
+    """``2026-09``, ``2026-07,2026-09`` or ``2025-01:2025-12``; default is last month."""
+    if not spec:
+        return [to_month(today) - 1]
+    months = []
+    for part in spec.split(","):
+        if ":" in part:
+            first, _, last = part.partition(":")
+            first, last = parse_month(first), parse_month(last)
+            if first > last:
+                raise ValueError(f"bad range {part.strip()!r}: ends before it starts")
+            months.extend(range(first, last + 1))
+        else:
+            months.append(parse_month(part))
+    return sorted(set(months))
+
+
+def select_accounts(rows, spec):
+    if not spec:
+        return list(rows)
+    wanted = {part.strip() for part in spec.split(",")}
+    chosen = [row for row in rows if str(row[0]) in wanted or row[1] in wanted]
+    missing = wanted - {str(row[0]) for row in chosen} - {row[1] for row in chosen}
+    if missing:
+        raise ValueError(f"Unknown accounts: {sorted(missing)}")
+    return chosen
+
+
+# ----------------------------
+# REPORT CONTENT
+# ----------------------------
+def month_summary(account, days, pnl, daily_days, daily_pnl, aggregates, month, today):
+    """Everything a month report shows, from one account's loaded history."""
+    start, stop = month_bounds(month)
+    year, month_number = divmod(month, 12)
+    last_day = calendar.monthrange(1970 + year, month_number + 1)[1]
+    is_open = to_month(today) == month
+    as_of = today if is_open else date(1970 + year, month_number + 1, last_day)
+    month_agg = aggregates.month(month)
+    metrics = compute_metrics(month_agg.total, account.monthly_target, as_of, last_day)
+    upto = slice(0, int(np.searchsorted(daily_days, stop)))
+    risk = RiskState.from_daily(daily_days[upto], daily_pnl[upto]).summary()
+    summary = {
+        "account": account.name,
+        "month": month_label(month),
+        "status": "open" if is_open else "closed",
+        "capital": account.capital,
+        "leverage": account.leverage,
+        "monthly_target": account.monthly_target,
+        "total_pnl": month_agg.total,
+        "progress_percent": float(metrics.progress_percent),
+        "remaining": float(metrics.remaining),
+        "entries": month_agg.count,
+        "win_days": month_agg.wins,
+        "loss_days": month_agg.losses,
+        "max_drawdown": risk["max_drawdown"],
+        "max_drawdown_days": risk["max_drawdown_days"],
+        "sharpe": risk["sharpe"],
+        "sortino": risk["sortino"],
+        "profit_factor": risk["profit_factor"],
+    }
+    if is_open:
+        summary["days_left"] = metrics.days_left
+        summary["daily_needed"] = float(metrics.daily_needed)
+        today_day = to_day(today)
+        sessions = remaining_sessions(today_day, stop, len(daily_days) > 0 and daily_days[-1] == today_day)
+        projection = simulate(daily_pnl[upto], month_agg.total, account.monthly_target, sessions)
+        if projection is not None:
+            summary["target_probability"] = projection.probability
+    window = range_slice(days, start, stop)
+    return summary, (days[window], pnl[window]), (daily_days[upto], np.cumsum(daily_pnl[upto]))
+
+
+@lru_cache(maxsize=None)
+def _report_template():
+    # make_subplots and plotly's validation dominate a report's cost, so each
+    # process lays the figure out once and every report fills in a copy.
+    figure = make_subplots(
+        rows=3, cols=1, row_heights=(0.4, 0.3, 0.3), vertical_spacing=0.06,
+        specs=[[{"type": "table"}], [{}], [{}]],
+        subplot_titles=("", "Daily P&L", "Cumulative P&L (to month end)"),
+    )
+    figure.add_trace(go.Table(header={"values": ["Metric", "Value"]}), row=1, col=1)
+    figure.add_trace(go.Bar(name="Daily P&L"), row=2, col=1)
+    figure.add_trace(go.Scatter(mode="lines", name="Cumulative"), row=3, col=1)
+    figure.update_layout(showlegend=False)
+    return figure.to_dict()
+
+
+def report_figure(summary, month_series, equity_series):
+    """One figure dict per report: metrics table, the month's days and the equity curve."""
+    figure = copy.deepcopy(_report_template())
+    table, bars, line = figure["data"]
+    labels, values = zip(*((key.replace("_", " ").title().replace("Pnl", "P&L"), _format(key, value)) for key, value in summary.items()))
+    table["cells"] = {"values": [labels, values]}
+    month_days, month_pnl = month_series
+    bars["x"], bars["y"] = days_to_datetime64(month_days), month_pnl
+    equity_days, equity = equity_series
+    index = lttb(equity_days, equity, CHART_WIDTH_PX * POINTS_PER_PX)
+    line["x"], line["y"] = days_to_datetime64(equity_days[index]), equity[index]
+    figure["layout"]["title"] = {"text": f"{summary['account']} · {summary['month']} ({summary['status']})"}
+    return figure
+
+
+def _format(key, value):
+    if isinstance(value, str):
+        return value
+    if key == "progress_percent":
+        return f"{value:.1f}%"
+    if key == "target_probability":
+        return f"{value:.0%}"
+    if key in ("sharpe", "sortino", "profit_factor", "leverage"):
+        return f"{value:.2f}"
+    if isinstance(value, (int, np.integer)):
+        return f"{value:,}"
+    return f"₹{value:,.0f}"
+
+
+# ----------------------------
+# WORKER
+# ----------------------------
+def render_account(db_path, row, months, formats, out_dir, today, embed_js=False):
+    """Render every requested month/format of one account; returns manifest records."""
+    account = Account(*row)
+    store = PnLStore(db_path)
+    try:
+        revision, days, pnl = store.snapshot(account.id)
+    finally:
+        store.close()
+    aggregates = RunningAggregates()
+    aggregates.add_arrays(days, pnl)
+    daily_days, inverse = np.unique(days, return_inverse=True)
+    daily_pnl = np.bincount(inverse, weights=pnl, minlength=len(daily_days))
+
+    folder = os.path.join(out_dir, _folder(account.id, account.name))
+    os.makedirs(folder, exist_ok=True)
+    records = []
+    for month in months:
+        started = time.perf_counter()
+        summary, month_series, equity_series = month_summary(account, days, pnl, daily_days, daily_pnl, aggregates, month, today)
+        figure = report_figure(summary, month_series, equity_series)
+        for fmt in formats:
+            path = os.path.join(folder, f"{month_label(month)}.{fmt}")
+            _write(figure, path, fmt, embed_js)
+            records.append({"account": account.id, "name": account.name, "month": month_label(month), "format": fmt,
+                            "path": os.path.relpath(path, out_dir), "revision": revision,
+                            "seconds": round(time.perf_counter() - started, 4)})
+    return records
+
+
+def _write(figure, path, fmt, embed_js):
+    # Write-then-rename so a crash never leaves a truncated report behind.
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if fmt == "html":
+        html = pio.to_html(figure, include_plotlyjs=False, full_html=True, validate=False)
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(html.replace("</head>", _plotlyjs_tags(embed_js) + "</head>", 1))
+    else:
+        pio.write_image(figure, tmp, format=fmt, width=IMAGE_SIZE[0], height=IMAGE_SIZE[1], validate=False)
+    os.replace(tmp, path)
+
+
+@lru_cache(maxsize=None)
+def _plotlyjs_tags(embed_js):
+    # plotly re-reads and hashes its bundle for every to_html call with a
+    # CDN or inline script; take its script tags once and reuse them.
+    html = pio.to_html({"data": [], "layout": {}}, include_plotlyjs=True if embed_js else "cdn", full_html=False, validate=False)
+    return html.split("<div id=", 1)[0].removeprefix("<div>")
+
+
+def _folder(account_id, name):
+    # The id keeps names that sanitise alike (say "A/B" and "A_B") apart.
+    return f"{account_id}-{_safe_name(name)}"
+
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name) or "account"
+
+
+# ----------------------------
+# DRIVER
+# ----------------------------
+def load_manifest(out_dir):
+    done = {}
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return done
+    with open(path) as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            # Reports filed under another folder (an older layout, or a
+            # since-renamed account) are redone where they belong now.
+            if (os.path.dirname(record["path"]) == _folder(record["account"], record["name"])
+                    and os.path.exists(os.path.join(out_dir, record["path"]))):
+                done[(record["account"], record["month"], record["format"])] = record["revision"]
+    return done
+
+
+def plan(rows, months, formats, done):
+    """Per account, the months that still need any format (given current revisions)."""
+    jobs = []
+    for row in rows:
+        account, revision = row[0], row[-1]
+        todo = [m for m in months if any(done.get((account, month_label(m), fmt)) != revision for fmt in formats)]
+        if todo:
+            jobs.append((row, todo))
+    return jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DB_PATH, help="store path (default: PNL_DB_PATH or pnl_data.db)")
+    parser.add_argument("--out", default="reports", help="output directory (default: reports)")
+    parser.add_argument("--months", help="YYYY-MM, comma list or YYYY-MM:YYYY-MM range (default: last month)")
+    parser.add_argument("--accounts", help="comma-separated account ids or names (default: all)")
+    parser.add_argument("--formats", default="html", help="comma-separated: html,png,pdf (default: html)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and redo every report")
+    parser.add_argument("--embed-js", action="store_true", help="inline plotly.js so HTML works offline")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip().lower() for f in args.formats.split(",")]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown formats: {sorted(unknown)}")
+    if set(formats) & {"png", "pdf"}:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            parser.error("PNG/PDF output needs the optional 'kaleido' package (pip install kaleido)")
+
+    today = date.today()
+    try:
+        months = parse_months(args.months, today)
+    except ValueError as exc:
+        parser.error(str(exc))
+    store = PnLStore(args.db)
+    try:
+        rows = select_accounts(store.accounts(), args.accounts)
+    except ValueError as exc:
+        parser.error(str(exc))
+    finally:
+        store.close()
+
+    os.makedirs(args.out, exist_ok=True)
+    jobs = plan(rows, months, formats, {} if args.force else load_manifest(args.out))
+    print(f"{len(jobs)} of {len(rows)} accounts need reports ({len(months)} months x {len(formats)} formats).")
+
+    started = time.perf_counter()
+    written = failed = 0
+    with open(os.path.join(args.out, MANIFEST), "a") as manifest, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(render_account, args.db, row, todo, formats, args.out, today, args.embed_js): row
+                   for row, todo in jobs}
+        for future in as_completed(futures):
+            row = futures[future]
+            try:
+                records = future.result()
+            except Exception as exc:  # one bad account must not sink the batch
+                failed += 1
+                print(f"FAILED {row[1]}: {exc}", file=sys.stderr)
+                continue
+            for record in records:
+                manifest.write(json.dumps(record) + "\n")
+            manifest.flush()
+            written += len(records)
+    print(f"Wrote {written:,} reports in {time.perf_counter() - started:.1f}s ({failed} accounts failed).")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+import math
+import threading
+
+import numpy as np
+
+from pnl_store import DEFAULT_ACCOUNT
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+TRADING_DAYS = 252
+ROLLING_WINDOWS = (20, 60)
+INITIAL_CAPACITY = 1024
+
+
+# ----------------------------
+# RISK STATE
+# ----------------------------
+class RiskState:
+    """Scalar statistics folded over the daily series so far.
+
+    Everything here is a running sum, extreme or counter, so appending a day
+    is O(1); the vectorised ``from_daily`` builds the same state in one pass.
+    """
+
+    __slots__ = ("days", "total", "sumsq", "downsq", "gross_profit", "gross_loss", "wins", "losses",
+                 "peak", "peak_day", "max_drawdown", "max_drawdown_days", "streak",
+                 "best_win_streak", "worst_loss_streak", "last_day")
+
+    def __init__(self):
+        self.days = 0
+        self.total = 0.0
+        self.sumsq = 0.0
+        self.downsq = 0.0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.wins = 0
+        self.losses = 0
+        self.peak = 0.0
+        self.peak_day = None
+        self.max_drawdown = 0.0
+        self.max_drawdown_days = 0
+        # Signed: +3 is three winning days in a row, -2 two losing days.
+        self.streak = 0
+        self.best_win_streak = 0
+        self.worst_loss_streak = 0
+        self.last_day = None
+
+    def copy(self):
+        other = RiskState.__new__(RiskState)
+        for name in RiskState.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
+
+    def add(self, day, pnl):
+        if self.peak_day is None:
+            self.peak_day = day - 1
+        self.days += 1
+        self.total += pnl
+        self.sumsq += pnl * pnl
+        if pnl > 0:
+            self.gross_profit += pnl
+            self.wins += 1
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+            self.best_win_streak = max(self.best_win_streak, self.streak)
+        elif pnl < 0:
+            self.downsq += pnl * pnl
+            self.gross_loss -= pnl
+            self.losses += 1
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+            self.worst_loss_streak = max(self.worst_loss_streak, -self.streak)
+        else:
+            self.streak = 0
+        if self.total >= self.peak:
+            self.peak, self.peak_day = self.total, day
+        else:
+            self.max_drawdown = min(self.max_drawdown, self.total - self.peak)
+            self.max_drawdown_days = max(self.max_drawdown_days, day - self.peak_day)
+        self.last_day = day
+
+    @classmethod
+    def from_daily(cls, days, pnl):
+        """Fold a sorted, one-row-per-day series in with vectorised passes."""
+        state = cls()
+        n = len(days)
+        if n == 0:
+            return state
+        equity = np.cumsum(pnl)
+        # The account starts flat the day before its first entry.
+        peak = np.maximum.accumulate(np.maximum(equity, 0.0))
+        drawdown = equity - peak
+        at_peak = drawdown >= 0
+        peak_pos = np.maximum.accumulate(np.where(at_peak, np.arange(n), -1))
+        peak_days = np.where(peak_pos >= 0, days[np.maximum(peak_pos, 0)], days[0] - 1)
+        underwater = ~at_peak
+
+        state.days = n
+        state.total = float(equity[-1])
+        state.sumsq = float(np.dot(pnl, pnl))
+        losses = pnl[pnl < 0]
+        state.downsq = float(np.dot(losses, losses))
+        state.gross_profit = float(pnl[pnl > 0].sum())
+        state.gross_loss = float(-losses.sum())
+        state.wins = int((pnl > 0).sum())
+        state.losses = len(losses)
+        state.peak = float(peak[-1])
+        state.peak_day = int(peak_days[-1])
+        state.max_drawdown = float(drawdown.min())
+        state.max_drawdown_days = int((days - peak_days)[underwater].max()) if underwater.any() else 0
+
+        sign = np.sign(pnl).astype(np.int8)
+        starts = np.flatnonzero(np.concatenate(([True], sign[1:] != sign[:-1])))
+        lengths = np.diff(np.append(starts, n))
+        run_sign = sign[starts]
+        state.best_win_streak = int(lengths[run_sign > 0].max(initial=0))
+        state.worst_loss_streak = int(lengths[run_sign < 0].max(initial=0))
+        state.streak = int(run_sign[-1]) * int(lengths[-1])
+        state.last_day = int(days[-1])
+        return state
+
+    def summary(self):
+        n = self.days
+        mean = self.total / n if n else 0.0
+        variance = (self.sumsq - n * mean * mean) / (n - 1) if n > 1 else 0.0
+        std = math.sqrt(max(variance, 0.0))
+        downside = math.sqrt(self.downsq / n) if n else 0.0
+        scale = math.sqrt(TRADING_DAYS)
+        return {
+            "days": n,
+            "max_drawdown": self.max_drawdown,
+            "max_drawdown_days": self.max_drawdown_days,
+            "current_drawdown": self.total - self.peak,
+            "sharpe": mean / std * scale if std else float("nan"),
+            "sortino": mean / downside * scale if downside else float("nan"),
+            "profit_factor": self.gross_profit / self.gross_loss if self.gross_loss else float("inf"),
+            "win_rate": self.wins / n if n else 0.0,
+            "streak": self.streak,
+            "best_win_streak": self.best_win_streak,
+            "worst_loss_streak": self.worst_loss_streak,
+        }
+
+
+# ----------------------------
+# ENGINE
+# ----------------------------
+class RiskEngine:
+    """Risk statistics over one account's daily P&L, kept current on append.
+
+    Entries are summed per day. Days appended at or after the last stored
+    day update the state in O(1), reusing the state before the last day when
+    that day gets another entry; anything earlier triggers one vectorised
+    rebuild. Prefix sums back the rolling windows, so the latest window is
+    O(1) and the full rolling series is a single pass of differences.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._n = 0
+        self._days = np.empty(INITIAL_CAPACITY, dtype=np.int32)
+        self._pnl = np.empty(INITIAL_CAPACITY, dtype=np.float64)
+        # Prefix sums with a leading zero: _csum[i] is the sum of the first i days.
+        self._csum = np.zeros(INITIAL_CAPACITY + 1, dtype=np.float64)
+        self._csumsq = np.zeros(INITIAL_CAPACITY + 1, dtype=np.float64)
+        self._cwins = np.zeros(INITIAL_CAPACITY + 1, dtype=np.int64)
+        self.state = RiskState()
+        self._before_last = RiskState()
+
+    @classmethod
+    def from_store(cls, store, account=DEFAULT_ACCOUNT):
+        engine = cls()
+        engine.add_arrays(*store.load_arrays(account=account))
+        return engine
+
+    @property
+    def days(self):
+        return self._days[:self._n]
+
+    @property
+    def pnl(self):
+        return self._pnl[:self._n]
+
+    def add(self, day, pnl):
+        day, pnl = int(day), float(pnl)
+        with self._lock:
+            last = self.state.last_day
+            if last is None or day > last:
+                self._before_last = self.state.copy()
+                self._append(day, pnl)
+                self.state.add(day, pnl)
+            elif day == last:
+                pnl += self._pnl[self._n - 1]
+                self._n -= 1
+                self._append(day, pnl)
+                self.state = self._before_last.copy()
+                self.state.add(day, pnl)
+            else:
+                self._rebuild(np.append(self.days, day), np.append(self.pnl, pnl))
+
+    def remove_day(self, day):
+        """Drop a day that no longer has any entries."""
+        with self._lock:
+            keep = self.days != int(day)
+            if not keep.all():
+                self._rebuild(self.days[keep], self.pnl[keep])
+
+    def add_arrays(self, days, pnl):
+        days = np.asarray(days, dtype=np.int32)
+        if len(days) == 0:
+            return
+        with self._lock:
+            self._rebuild(np.concatenate((self.days, days)), np.concatenate((self.pnl, np.asarray(pnl, dtype=np.float64))))
+
+    def summary(self):
+        with self._lock:
+            return self.state.summary()
+
+    def latest_window(self, window):
+        """Sum, mean, win rate and annualised Sharpe of the last ``window`` days."""
+        with self._lock:
+            n = min(window, self._n)
+            if n == 0:
+                return None
+            total = self._csum[self._n] - self._csum[self._n - n]
+            sumsq = self._csumsq[self._n] - self._csumsq[self._n - n]
+            wins = self._cwins[self._n] - self._cwins[self._n - n]
+        return _window_stats(total, sumsq, wins, n)
+
+    def rolling(self, windows=ROLLING_WINDOWS):
+        """Rolling sum, win rate and Sharpe per window by day; NaN until a window fills."""
+        with self._lock:
+            n = self._n
+            days = self._days[:n].copy()
+            csum, csumsq, cwins = self._csum[:n + 1].copy(), self._csumsq[:n + 1].copy(), self._cwins[:n + 1].copy()
+        data = {"day": days}
+        for window in windows:
+            stats = {"sum": np.full(n, np.nan), "sharpe": np.full(n, np.nan), "win_rate": np.full(n, np.nan)}
+            if n >= window:
+                total = csum[window:] - csum[:-window]
+                sumsq = csumsq[window:] - csumsq[:-window]
+                wins = cwins[window:] - cwins[:-window]
+                full = _window_stats(total, sumsq, wins, window)
+                for key in stats:
+                    stats[key][window - 1:] = full[key]
+            for key, values in stats.items():
+                data[f"{key}_{window}d"] = values
+        import pandas as pd
+        return pd.DataFrame(data)
+
+    def _append(self, day, pnl):
+        if self._n == len(self._days):
+            self._grow(2 * len(self._days))
+        i = self._n
+        self._days[i] = day
+        self._pnl[i] = pnl
+        self._csum[i + 1] = self._csum[i] + pnl
+        self._csumsq[i + 1] = self._csumsq[i] + pnl * pnl
+        self._cwins[i + 1] = self._cwins[i] + (pnl > 0)
+        self._n += 1
+
+    def _grow(self, capacity):
+        # Prefix arrays carry one extra leading slot.
+        extra = {"_days": 0, "_pnl": 0, "_csum": 1, "_csumsq": 1, "_cwins": 1}
+        for name, pad in extra.items():
+            old = getattr(self, name)
+            new = np.zeros(capacity + pad, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _rebuild(self, days, pnl):
+        unique, inverse = np.unique(days, return_inverse=True)
+        daily = np.bincount(inverse, weights=pnl, minlength=len(unique))
+        n = len(unique)
+        if n > len(self._days):
+            self._grow(max(n, 2 * len(self._days)))
+        self._days[:n] = unique
+        self._pnl[:n] = daily
+        self._csum[1:n + 1] = np.cumsum(daily)
+        self._csumsq[1:n + 1] = np.cumsum(daily * daily)
+        self._cwins[1:n + 1] = np.cumsum(daily > 0)
+        self._n = n
+        self.state = RiskState.from_daily(unique, daily)
+        self._before_last = RiskState.from_daily(unique[:-1], daily[:-1])
+
+
+# ----------------------------
+# HELPERS
+# ----------------------------
+def _window_stats(total, sumsq, wins, n):
+    mean = total / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std = np.sqrt(np.maximum((sumsq - n * mean * mean) / (n - 1), 0.0)) if n > 1 else np.zeros_like(mean)
+        sharpe = np.where(std > 0, mean / std * math.sqrt(TRADING_DAYS), np.nan)
+    return {"sum": total, "mean": mean, "win_rate": wins / n, "sharpe": sharpe[()]}
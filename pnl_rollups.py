@@ -0,0 +1,98 @@
+import numpy as np
+
+from pnl_dates import days_to_datetime64, month_label, month_offsets
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+# One row per account and month. wins/losses count entries (as the running
+# aggregates do); best/worst are whole-day totals; cumulative is the
+# account's running total at the end of the month.
+ROLLUP_COLUMNS = ("month", "total", "entries", "wins", "losses", "days",
+                  "best_day", "best_pnl", "worst_day", "worst_pnl", "cumulative")
+_INT_COLUMNS = {"month", "entries", "wins", "losses", "days", "best_day", "worst_day"}
+
+
+# ----------------------------
+# ROLLUPS
+# ----------------------------
+# A set of rollups is a dict of equal-length NumPy arrays keyed by
+# ROLLUP_COLUMNS and sorted by month, the same shape the store reads back.
+def empty_rollups():
+    return {c: np.empty(0, dtype=np.int64 if c in _INT_COLUMNS else np.float64) for c in ROLLUP_COLUMNS}
+
+
+def rollups_from_rows(rows):
+    """Column arrays from ``ROLLUP_COLUMNS``-ordered row tuples."""
+    if not rows:
+        return empty_rollups()
+    return {c: np.array(col, dtype=np.int64 if c in _INT_COLUMNS else np.float64)
+            for c, col in zip(ROLLUP_COLUMNS, zip(*rows))}
+
+
+def rollup_months(days, pnl, cumulative=0.0):
+    """Roll entries up per month in a few vectorised passes.
+
+    ``cumulative`` is the running total before the first month, so rollups
+    of consecutive ranges chain into one series.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    pnl = np.asarray(pnl, dtype=np.float64)
+    if len(days) == 0:
+        return empty_rollups()
+    if np.any(days[1:] < days[:-1]):
+        order = np.argsort(days, kind="stable")
+        days, pnl = days[order], pnl[order]
+    months, offsets = month_offsets(days)
+    starts = offsets[:-1]
+    totals = np.add.reduceat(pnl, starts)
+    entries = np.diff(offsets)
+    wins = np.add.reduceat((pnl > 0).astype(np.int64), starts)
+
+    unique, inverse = np.unique(days, return_inverse=True)
+    daily = np.bincount(inverse, weights=pnl, minlength=len(unique))
+    _, day_offsets = month_offsets(unique)
+    day_starts = day_offsets[:-1]
+    group = np.repeat(np.arange(len(months)), np.diff(day_offsets))
+    # Sorting by (month, -pnl) puts each month's best day first, and
+    # likewise its worst for (month, pnl).
+    best = np.lexsort((-daily, group))[day_starts]
+    worst = np.lexsort((daily, group))[day_starts]
+    return {
+        "month": months.astype(np.int64),
+        "total": totals,
+        "entries": entries.astype(np.int64),
+        "wins": wins,
+        "losses": entries - wins,
+        "days": np.diff(day_offsets).astype(np.int64),
+        "best_day": unique[best],
+        "best_pnl": daily[best],
+        "worst_day": unique[worst],
+        "worst_pnl": daily[worst],
+        "cumulative": cumulative + np.cumsum(totals),
+    }
+
+
+def concat_rollups(*parts):
+    return {c: np.concatenate([part[c] for part in parts]) for c in ROLLUP_COLUMNS}
+
+
+def end_total(rollups):
+    """Running total after the last month, the ``cumulative`` to chain on from."""
+    return float(rollups["cumulative"][-1]) if len(rollups["month"]) else 0.0
+
+
+def summary_frame(rollups):
+    """The Monthly Summary table, one row per month."""
+    import pandas as pd
+    return pd.DataFrame({
+        "Month": [month_label(m) for m in rollups["month"]],
+        "Total P&L": rollups["total"],
+        "Days": rollups["days"],
+        "Win %": rollups["wins"] / np.maximum(rollups["entries"], 1) * 100,
+        "Best Day": days_to_datetime64(rollups["best_day"]),
+        "Best P&L": rollups["best_pnl"],
+        "Worst Day": days_to_datetime64(rollups["worst_day"]),
+        "Worst P&L": rollups["worst_pnl"],
+        "Cumulative": rollups["cumulative"],
+    })
@@ -0,0 +1,835 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from pnl_dates import days_to_months, month_first_day, to_day
+from pnl_entries import EntryArrays
+from pnl_rollups import ROLLUP_COLUMNS, concat_rollups, end_total, rollup_months, rollups_from_rows
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+DB_PATH = os.environ.get(
+    "PNL_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "pnl_data.db"),
+)
+
+SCHEMA_VERSION = 10
+DEFAULT_ACCOUNT = 1
+# Reader connections shared by every session; WAL lets them read while the
+# single writer commits.
+POOL_SIZE = int(os.environ.get("PNL_DB_POOL", "4"))
+BUSY_TIMEOUT_MS = 5000
+PAGE_SIZE = 50
+# entries.source: typed in or imported as daily P&L, or the day's total
+# over its fills (one such entry per day, re-totalled by every fills import).
+SOURCE_MANUAL = 0
+SOURCE_FILLS = 1
+# A restore this large drops the entries' secondary indexes and rebuilds
+# them afterwards: one sort beats millions of scattered B-tree inserts.
+BULK_ROWS = 100_000
+BULK_INDEXES = {"idx_entries_day": "entries(day)", "idx_entries_account_pnl": "entries(account, pnl)"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id  INTEGER PRIMARY KEY AUTOINCREMENT,
+    day INTEGER NOT NULL,
+    pnl REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_day ON entries(day);
+"""
+
+# v1 kept ISO date text; day ordinals are days since 1970-01-01.
+MIGRATE_V1 = """
+ALTER TABLE entries RENAME TO entries_v1;
+DROP INDEX IF EXISTS idx_entries_date;
+""" + SCHEMA + """
+INSERT INTO entries (id, day, pnl)
+    SELECT id, CAST(julianday(date) - 2440587.5 AS INTEGER), pnl FROM entries_v1;
+DROP TABLE entries_v1;
+"""
+
+# Trade-level detail. qty is signed (buys positive) and pnl is the P&L the
+# fill realises against the symbol's average-cost position, net of fees,
+# materialised at ingest (pnl_trades.PositionBook).
+FILLS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts       INTEGER NOT NULL,
+    day      INTEGER NOT NULL,
+    symbol   TEXT NOT NULL,
+    strategy TEXT NOT NULL DEFAULT '',
+    qty      REAL NOT NULL,
+    price    REAL NOT NULL,
+    fees     REAL NOT NULL DEFAULT 0,
+    pnl      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fills_day ON fills(day);
+"""
+
+# v4: every entry and fill belongs to an account; rows written before
+# accounts existed belong to DEFAULT_ACCOUNT, seeded with the parameters
+# the dashboard used to hardcode.
+ACCOUNTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    name           TEXT NOT NULL UNIQUE,
+    capital        REAL NOT NULL,
+    leverage       REAL NOT NULL,
+    target_percent REAL NOT NULL
+);
+INSERT OR IGNORE INTO accounts (id, name, capital, leverage, target_percent) VALUES (1, 'Main', 20000, 5, 5);
+ALTER TABLE entries ADD COLUMN account INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE fills ADD COLUMN account INTEGER NOT NULL DEFAULT 1;
+CREATE INDEX IF NOT EXISTS idx_entries_account_day ON entries(account, day);
+CREATE INDEX IF NOT EXISTS idx_fills_account_day ON fills(account, day);
+"""
+
+# v5: a shared data version plus per-account and per-entry revisions, so
+# sessions (and processes) sharing the file can tell when derived state is
+# stale and edits can be checked against the revision the editor saw.
+SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+ALTER TABLE accounts ADD COLUMN revision INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE entries ADD COLUMN revision INTEGER NOT NULL DEFAULT 0;
+"""
+
+# v6: sorting or filtering an account's entries by P&L walks an index
+# instead of sorting the whole history.
+PAGING_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_entries_account_pnl ON entries(account, pnl);
+"""
+
+# v7: closed months frozen into one row each. A write drops its account's
+# rollups from the earliest month it touched on, so the stored months are
+# always a prefix of the history and later months are re-rolled from raw rows.
+ROLLUPS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS month_rollups (
+    account    INTEGER NOT NULL,
+    month      INTEGER NOT NULL,
+    total      REAL NOT NULL,
+    entries    INTEGER NOT NULL,
+    wins       INTEGER NOT NULL,
+    losses     INTEGER NOT NULL,
+    days       INTEGER NOT NULL,
+    best_day   INTEGER NOT NULL,
+    best_pnl   REAL NOT NULL,
+    worst_day  INTEGER NOT NULL,
+    worst_pnl  REAL NOT NULL,
+    cumulative REAL NOT NULL,
+    PRIMARY KEY (account, month)
+) WITHOUT ROWID;
+"""
+
+# v8: a random id for this store file, so an Arrow export (pnl_arrow.py)
+# can tell the store it came from apart from one with the same revisions.
+INSTANCE_SCHEMA = """
+INSERT OR IGNORE INTO meta (key, value) VALUES ('instance', abs(random()));
+"""
+
+# v9: a fill is identified by its account, timestamp, symbol, qty and price,
+# so re-importing an overlapping export stores each fill once. Duplicates
+# written before this keep their oldest copy.
+FILLS_UNIQUE_SCHEMA = """
+DELETE FROM fills WHERE id NOT IN (SELECT MIN(id) FROM fills GROUP BY account, ts, symbol, qty, price);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_fills_unique ON fills(account, ts, symbol, qty, price);
+"""
+
+# v10: entries rolled up from fills are marked, so a later fills import for
+# the same day re-totals that entry instead of adding to or skipping the day.
+# Older fills imports wrote one entry per day holding the sum of that day's
+# fills; entries that still match their day's fills are taken to be those.
+FILL_ENTRIES_SCHEMA = """
+ALTER TABLE entries ADD COLUMN source INTEGER NOT NULL DEFAULT 0;
+UPDATE entries SET source = 1 WHERE id IN (
+    SELECT e.id FROM entries e JOIN (SELECT account, day, SUM(pnl) AS pnl FROM fills GROUP BY account, day) f
+        ON f.account = e.account AND f.day = e.day
+    WHERE abs(e.pnl - f.pnl) < 0.005
+);
+"""
+
+# v10 also: a fill is identified by the broker's trade id when the export
+# has one, else by its values plus seq, its occurrence number among
+# identical rows of its file, so equal partial fills in one second are kept.
+FILL_IDS_SCHEMA = """
+ALTER TABLE fills ADD COLUMN trade_id TEXT NOT NULL DEFAULT '';
+ALTER TABLE fills ADD COLUMN seq INTEGER NOT NULL DEFAULT 0;
+DROP INDEX IF EXISTS idx_fills_unique;
+CREATE UNIQUE INDEX idx_fills_unique ON fills(account, ts, symbol, qty, price, seq) WHERE trade_id = '';
+CREATE UNIQUE INDEX idx_fills_trade_id ON fills(account, trade_id) WHERE trade_id != '';
+"""
+
+# v10 also: each symbol's average-cost position after its last stored fill,
+# so a fills import starts from it instead of replaying the symbol's
+# history. Symbols filled before this get a NULL cost, which makes the next
+# import replay them once and store the result.
+POSITIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    account INTEGER NOT NULL,
+    symbol  TEXT NOT NULL,
+    qty     REAL NOT NULL,
+    cost    REAL,
+    ts      INTEGER NOT NULL,
+    PRIMARY KEY (account, symbol)
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO positions (account, symbol, qty, cost, ts)
+    SELECT account, symbol, SUM(qty), NULL, MAX(ts) FROM fills GROUP BY account, symbol;
+"""
+
+ENTRY_COLUMNS = ("id", "revision", "day", "date", "pnl")
+ENTRY_SORTS = ("day", "pnl")
+ACCOUNT_COLUMNS = ("id", "name", "capital", "leverage", "target_percent", "revision")
+FILL_COLUMNS = ("ts", "day", "symbol", "strategy", "qty", "price", "fees", "pnl", "trade_id", "seq")
+# Identity of a fill without a trade id.
+FILL_KEY = ("ts", "symbol", "qty", "price", "seq")
+# Bound parameters per IN (...) lookup, under SQLite's default limit.
+LOOKUP_BATCH = 500
+
+
+class ConflictError(RuntimeError):
+    """An entry changed (or vanished) since the revision the caller read."""
+
+
+class EntryChange:
+    """What an edit, delete or upsert did to one day of one account.
+
+    ``removed`` and ``added`` are the entry P&Ls taken off and put on the
+    day, ``remaining`` how many entries the day has afterwards, and
+    ``revision`` the account's revision after the write.
+    """
+
+    __slots__ = ("account", "revision", "day", "removed", "added", "remaining")
+
+    def __init__(self, account, revision, day, removed, added, remaining):
+        self.account = account
+        self.revision = revision
+        self.day = day
+        self.removed = removed
+        self.added = added
+        self.remaining = remaining
+
+    @property
+    def delta(self):
+        return sum(self.added) - sum(self.removed)
+
+
+# ----------------------------
+# CONNECTION POOL
+# ----------------------------
+class ConnectionPool:
+    """Up to ``size`` read-only connections, opened on demand and reused."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._all = []
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                conn = _connect(self.path)
+                conn.execute("PRAGMA query_only=ON")
+                self._all.append(conn)
+                return conn
+        return self._idle.get()
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+
+
+# ----------------------------
+# STORE
+# ----------------------------
+class PnLStore:
+    """Daily P&L entries persisted in SQLite (WAL mode), indexed by day.
+
+    Dates are stored as integer day ordinals (see ``pnl_dates``), so range
+    scans are integer index seeks and loaded columns become ``datetime64``
+    without any string parsing.
+
+    One store is shared by every session in the process. Reads go through a
+    connection pool and never wait on each other; writes are serialised on
+    one connection with ``BEGIN IMMEDIATE``. Every write bumps the shared
+    ``version`` and the touched accounts' revisions in the same transaction,
+    so other processes on the same file see the change too.
+    """
+
+    def __init__(self, path=DB_PATH, pool_size=POOL_SIZE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._pool = ConnectionPool(path, pool_size)
+        self.instance = self._conn.execute("SELECT value FROM meta WHERE key = 'instance'").fetchone()[0]
+        self.history = None
+
+    def _migrate(self):
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        with self.batch(bump=False) as batch:
+            # Re-read under the write lock: another process may have migrated.
+            current = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if current >= SCHEMA_VERSION:
+                return
+            steps = []
+            if current < 2:
+                columns = [row[1] for row in self._conn.execute("PRAGMA table_info(entries)")]
+                steps.append(MIGRATE_V1 if "date" in columns else SCHEMA)
+            if current < 3:
+                steps.append(FILLS_SCHEMA)
+            if current < 4:
+                steps.append(ACCOUNTS_SCHEMA)
+            if current < 5:
+                steps.append(SHARED_SCHEMA)
+            if current < 6:
+                steps.append(PAGING_SCHEMA)
+            if current < 7:
+                steps.append(ROLLUPS_SCHEMA)
+            if current < 8:
+                steps.append(INSTANCE_SCHEMA)
+            if current < 9:
+                steps.append(FILLS_UNIQUE_SCHEMA)
+            if current < 10:
+                steps.append(FILL_ENTRIES_SCHEMA)
+                steps.append(FILL_IDS_SCHEMA)
+                steps.append(POSITIONS_SCHEMA)
+            # executescript() would commit the open transaction; none of the
+            # scripts contain a semicolon inside a statement.
+            for statement in "".join(steps).split(";"):
+                if statement.strip():
+                    batch.execute(statement)
+            batch.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self._pool.close()
+        with self._lock:
+            self._conn.close()
+
+    @property
+    def version(self):
+        """Shared data version; bumped by every write from any session or process."""
+        with self._pool.connection() as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    @contextmanager
+    def batch(self, bump=True):
+        """Group several writes into one transaction and one version bump."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                batch = _Batch(self._conn)
+                yield batch
+                batch.drop_stale_rollups()
+                if bump:
+                    batch.bump()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def add_entry(self, date, pnl, account=DEFAULT_ACCOUNT):
+        """Insert one entry; returns the account's new revision."""
+        with self.batch() as batch:
+            batch.add_entries([_day(date)], [pnl], account)
+        return batch.revisions[int(account)]
+
+    def add_entries(self, days, pnl, account=DEFAULT_ACCOUNT):
+        """Insert a batch of ``(day, pnl)`` rows in a single transaction."""
+        with self.batch() as batch:
+            return batch.add_entries(days, pnl, account)
+
+    def update_entry(self, entry_id, pnl, revision):
+        """Set an entry's P&L if it is still at ``revision``; returns the ``EntryChange``."""
+        with self.batch() as batch:
+            account, day, old = batch.check(entry_id, revision)
+            self._conn.execute("UPDATE entries SET pnl = ?, revision = revision + 1 WHERE id = ?", (float(pnl), int(entry_id)))
+            batch.touch(account)
+            remaining = batch.day_entries(account, day)
+        return EntryChange(account, batch.revisions[account], day, [old], [float(pnl)], remaining)
+
+    def delete_entry(self, entry_id, revision):
+        """Delete an entry if it is still at ``revision``; returns the ``EntryChange``."""
+        with self.batch() as batch:
+            account, day, old = batch.check(entry_id, revision)
+            self._conn.execute("DELETE FROM entries WHERE id = ?", (int(entry_id),))
+            batch.touch(account)
+            remaining = batch.day_entries(account, day)
+        return EntryChange(account, batch.revisions[account], day, [old], [], remaining)
+
+    def upsert_day(self, date, pnl, account=DEFAULT_ACCOUNT):
+        """Make ``pnl`` the day's only entry, replacing whatever it had; returns the ``EntryChange``.
+
+        The day's oldest entry is kept (with a new revision) so open editors
+        see it as changed rather than vanished; any others are deleted.
+        """
+        day, account = _day(date), int(account)
+        with self.batch() as batch:
+            rows = self._conn.execute("SELECT id, pnl FROM entries WHERE account = ? AND day = ? ORDER BY id", (account, day)).fetchall()
+            if rows:
+                keep = rows[0][0]
+                # A typed-in value owns the day from now on, even if it replaces a fills total.
+                self._conn.execute("UPDATE entries SET pnl = ?, revision = revision + 1, source = ? WHERE id = ?",
+                                   (float(pnl), SOURCE_MANUAL, keep))
+                self._conn.execute("DELETE FROM entries WHERE account = ? AND day = ? AND id != ?", (account, day, keep))
+                batch.touch(account)
+                batch.stale(account, day)
+            else:
+                batch.add_entries([day], [pnl], account)
+        return EntryChange(account, batch.revisions[account], day, [row[1] for row in rows], [float(pnl)], 1)
+
+    def add_account(self, name, capital, leverage, target_percent):
+        """Create an account and return its id; names are unique."""
+        try:
+            with self.batch() as batch:
+                cursor = self._conn.execute(
+                    "INSERT INTO accounts (name, capital, leverage, target_percent) VALUES (?, ?, ?, ?)",
+                    (name, float(capital), float(leverage), float(target_percent)),
+                )
+                batch.touch(cursor.lastrowid)
+            return cursor.lastrowid
+        except sqlite3.IntegrityError:
+            raise ValueError(f"An account named {name!r} already exists") from None
+
+    def accounts(self):
+        """Every account as ``ACCOUNT_COLUMNS`` tuples, ordered by id."""
+        with self._pool.connection() as conn:
+            return conn.execute(f"SELECT {', '.join(ACCOUNT_COLUMNS)} FROM accounts ORDER BY id").fetchall()
+
+    def revision(self, account=DEFAULT_ACCOUNT):
+        with self._pool.connection() as conn:
+            return _revision(conn, account)
+
+    def account_totals(self, start=None, stop=None):
+        """``(accounts, totals)`` arrays: summed P&L per account in ``[start, stop)``."""
+        where, params = _day_filter(start, stop)
+        sql = f"SELECT account, SUM(pnl) FROM entries{where} GROUP BY account"
+        with self._pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        accounts, totals = zip(*rows)
+        return np.array(accounts, dtype=np.int64), np.array(totals, dtype=np.float64)
+
+    def total(self, start=None, stop=None, account=DEFAULT_ACCOUNT):
+        """Sum of one account's P&L over ``start <= day < stop`` via the (account, day) index."""
+        where, params = _day_filter(start, stop, account)
+        with self._pool.connection() as conn:
+            return conn.execute(f"SELECT COALESCE(SUM(pnl), 0.0) FROM entries{where}", params).fetchone()[0]
+
+    def day_summary(self, date, account=DEFAULT_ACCOUNT):
+        """``(entries, total)`` already stored for one day of one account."""
+        where, params = _day_filter(_day(date), _day(date) + 1, account)
+        with self._pool.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*), COALESCE(SUM(pnl), 0.0) FROM entries{where}", params).fetchone()
+
+    def existing_days(self, start=None, stop=None, account=DEFAULT_ACCOUNT):
+        where, params = _day_filter(start, stop, account)
+        with self._pool.connection() as conn:
+            rows = conn.execute(f"SELECT DISTINCT day FROM entries{where}", params).fetchall()
+        return np.array([row[0] for row in rows], dtype=np.int32)
+
+    def load_entries(self, start=None, stop=None, account=DEFAULT_ACCOUNT, ids=True):
+        """One account's entries with ``start <= day < stop`` as ``EntryArrays``, sorted by day.
+
+        ``ids=False`` leaves out the id and revision columns (and their read).
+        """
+        if not ids:
+            days, pnl = self.load_arrays(start, stop, account)
+            return EntryArrays.from_arrays(day=days, pnl=pnl)
+        where, params = _day_filter(start, stop, account)
+        with self._pool.connection() as conn:
+            rows = conn.execute(f"SELECT id, revision, day, pnl FROM entries{where} ORDER BY day, id", params).fetchall()
+        return EntryArrays.from_rows(rows)
+
+    def load(self, start=None, stop=None, columns=("date", "pnl"), account=DEFAULT_ACCOUNT):
+        """Load one account's entries with ``start <= day < stop`` as a DataFrame, sorted by day.
+
+        Only the requested columns are read, and the account and day bounds
+        are pushed down to the index so a single month never scans the full
+        history. The frame wraps the typed arrays of ``load_entries``.
+        """
+        unknown = set(columns) - set(ENTRY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {sorted(unknown)}")
+        return self.load_entries(start, stop, account, ids=bool({"id", "revision"} & set(columns))).frame(columns)
+
+    def entries_page(self, start=None, stop=None, account=DEFAULT_ACCOUNT, sign=None, min_abs=None,
+                     sort="day", descending=True, offset=0, limit=PAGE_SIZE):
+        """One page of an account's entries and the number matching the filter.
+
+        ``sign`` keeps gains (1) or losses (-1) and ``min_abs`` drops entries
+        smaller than that in size. Filtering, sorting and paging run in SQLite
+        on the (account, day) and (account, pnl) indexes, so only ``limit``
+        rows are read out. Returns ``(total, EntryArrays)``.
+        """
+        if sort not in ENTRY_SORTS:
+            raise ValueError(f"Unknown sort column: {sort!r}")
+        where, params = _day_filter(start, stop, account)
+        clauses = []
+        if sign is not None:
+            clauses.append("pnl > 0" if sign > 0 else "pnl < 0")
+        if min_abs:
+            if sign is None:
+                clauses.append("(pnl >= ? OR pnl <= ?)")
+                params += [float(min_abs), -float(min_abs)]
+            else:
+                clauses.append("pnl >= ?" if sign > 0 else "pnl <= ?")
+                params.append(float(min_abs) * sign)
+        if clauses:
+            where += (" AND " if where else " WHERE ") + " AND ".join(clauses)
+        direction = "DESC" if descending else "ASC"
+        with self._pool.connection() as conn:
+            # One read transaction, so the count and the page agree.
+            conn.execute("BEGIN")
+            try:
+                total = conn.execute(f"SELECT COUNT(*) FROM entries{where}", params).fetchone()[0]
+                rows = conn.execute(
+                    f"SELECT id, revision, day, pnl FROM entries{where} ORDER BY {sort} {direction}, id {direction} LIMIT ? OFFSET ?",
+                    params + [int(limit), int(offset)]).fetchall()
+            finally:
+                conn.execute("COMMIT")
+        return total, EntryArrays.from_rows(rows)
+
+    def attach_history(self, history):
+        """Answer whole-history reads from a memory-mapped export (``pnl_arrow.MappedHistory``).
+
+        ``load_arrays`` and ``snapshot`` slice the mapped columns instead of
+        fetching rows for any account still at the revision it was exported
+        at; the first write to an account sends it back to SQLite.
+        """
+        if history.instance != self.instance:
+            raise ValueError(f"{history.path} was exported from a different store than {self.path}")
+        self.history = history
+
+    def load_arrays(self, start=None, stop=None, account=DEFAULT_ACCOUNT):
+        """``(days, pnl)`` NumPy arrays for ``start <= day < stop``, sorted by day."""
+        with self._pool.connection() as conn:
+            return self._arrays(conn, start, stop, account)
+
+    def snapshot(self, account=DEFAULT_ACCOUNT):
+        """``(revision, days, pnl)`` for an account's full history, read as of one instant."""
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                revision = _revision(conn, account)
+                days, pnl = self._arrays(conn, None, None, account, revision)
+            finally:
+                conn.execute("COMMIT")
+        return revision, days, pnl
+
+    def rollup_snapshot(self, month, account=DEFAULT_ACCOUNT):
+        """``(revision, rollups, open_from, days, pnl)`` for months before ``month`` plus raw rows after.
+
+        ``rollups`` covers every month before ``month`` with entries and
+        ``days``/``pnl`` are the raw rows from day ``open_from`` on, so the
+        two add up to the full history. Closed months without a checkpoint
+        yet (the month that just ended, or ones a write invalidated) are
+        rolled up and stored first, inside the same transaction, so the
+        result is consistent and the next call reads them straight back.
+        """
+        account = int(account)
+        open_from = int(month_first_day(month))
+        with self.batch(bump=False):
+            revision = _revision(self._conn, account)
+            rollups = rollups_from_rows(self._conn.execute(
+                f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM month_rollups WHERE account = ? AND month < ? ORDER BY month",
+                (account, int(month))).fetchall())
+            start = int(month_first_day(rollups["month"][-1] + 1)) if len(rollups["month"]) else None
+            if start is None or start < open_from:
+                days, pnl = self._arrays(self._conn, start, open_from, account, revision)
+                closed = rollup_months(days, pnl, end_total(rollups))
+                columns = ("account",) + ROLLUP_COLUMNS
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO month_rollups ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    ((account,) + values for values in zip(*(closed[c].tolist() for c in ROLLUP_COLUMNS))))
+                rollups = concat_rollups(rollups, closed)
+            days, pnl = self._arrays(self._conn, open_from, None, account, revision)
+        return revision, rollups, open_from, days, pnl
+
+    def _arrays(self, conn, start, stop, account, revision=None):
+        """Rows from the attached export while it holds ``account`` at its current revision, else from SQLite."""
+        if self.history is not None:
+            # The export slices by day ordinal; SQLite's filter converts dates itself.
+            start = None if start is None else _day(start)
+            stop = None if stop is None else _day(stop)
+            if revision is None:
+                revision = _revision(conn, account)
+            if self.history.revision(account) == revision:
+                return self.history.arrays(account, start, stop)
+        return _load_arrays(conn, start, stop, account)
+
+    def load_fills(self, start=None, stop=None, columns=FILL_COLUMNS, account=DEFAULT_ACCOUNT):
+        unknown = set(columns) - set(FILL_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {sorted(unknown)}")
+        where, params = _day_filter(start, stop, account)
+        sql = f"SELECT {', '.join(columns)} FROM fills{where} ORDER BY day, ts, id"
+        import pandas as pd
+        with self._pool.connection() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def count(self):
+        with self._pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class _Batch:
+    def __init__(self, conn):
+        self._conn = conn
+        self._touched = set()
+        # Account id -> earliest day written, for dropping stale rollups.
+        self._stale = {}
+        # Filled in on commit: account id -> revision after this batch.
+        self.revisions = {}
+
+    def execute(self, sql, params=()):
+        return self._conn.execute(sql, params)
+
+    def touch(self, account):
+        self._touched.add(int(account))
+
+    def stale(self, account, day):
+        account, day = int(account), int(day)
+        self._stale[account] = min(day, self._stale.get(account, day))
+
+    def check(self, entry_id, revision):
+        """The entry's ``(account, day, pnl)`` if it is still at ``revision``; its month is about to change."""
+        row = self._conn.execute("SELECT account, revision, day, pnl FROM entries WHERE id = ?", (int(entry_id),)).fetchone()
+        if row is None:
+            raise ConflictError(f"Entry {entry_id} was deleted by another session")
+        if row[1] != revision:
+            raise ConflictError(f"Entry {entry_id} was changed by another session")
+        self.stale(row[0], row[2])
+        return row[0], row[2], row[3]
+
+    def day_entries(self, account, day):
+        return self._conn.execute("SELECT COUNT(*) FROM entries WHERE account = ? AND day = ?", (int(account), int(day))).fetchone()[0]
+
+    def drop_stale_rollups(self):
+        for account, day in self._stale.items():
+            month = int(days_to_months([day])[0])
+            self._conn.execute("DELETE FROM month_rollups WHERE account = ? AND month >= ?", (account, month))
+        self._stale.clear()
+
+    def bump(self):
+        self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        for account in sorted(self._touched):
+            self._conn.execute("UPDATE accounts SET revision = revision + 1 WHERE id = ?", (account,))
+            row = self._conn.execute("SELECT revision FROM accounts WHERE id = ?", (account,)).fetchone()
+            self.revisions[account] = row[0] if row else 0
+
+    def add_entries(self, days, pnl, account=DEFAULT_ACCOUNT):
+        self.touch(account)
+        days = np.asarray(days, dtype=np.int64)
+        if len(days):
+            self.stale(account, days.min())
+        days = days.tolist()
+        rows = zip([int(account)] * len(days), days, np.asarray(pnl, dtype=np.float64).tolist())
+        return self._conn.executemany("INSERT INTO entries (account, day, pnl) VALUES (?, ?, ?)", rows).rowcount
+
+    def put_fill_entries(self, days, skip_manual=True, account=DEFAULT_ACCOUNT):
+        """Set each day's fills entry to the total of the day's stored fills; returns ``(days, pnl, skipped)``.
+
+        A day without a fills entry gets one, unless ``skip_manual`` and the
+        day already has other entries, which then count as ``skipped``.
+        ``days`` and ``pnl`` are the entries written.
+        """
+        account = int(account)
+        days = np.unique(np.asarray(days, dtype=np.int64)).tolist()
+        if not days:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64), 0
+        span = (account, days[0], days[-1])
+        totals = dict(self._conn.execute(
+            "SELECT day, SUM(pnl) FROM fills WHERE account = ? AND day BETWEEN ? AND ? GROUP BY day", span))
+        fill_entries, manual = {}, set()
+        for day, entry_id, source in self._conn.execute(
+                "SELECT day, id, source FROM entries WHERE account = ? AND day BETWEEN ? AND ?", span):
+            if source == SOURCE_FILLS:
+                fill_entries[day] = entry_id
+            else:
+                manual.add(day)
+        updates, inserts, written, skipped = [], [], [], 0
+        for day in days:
+            if day in fill_entries:
+                updates.append((totals[day], fill_entries[day]))
+            elif skip_manual and day in manual:
+                skipped += 1
+                continue
+            else:
+                inserts.append((account, day, totals[day], SOURCE_FILLS))
+            written.append(day)
+        if written:
+            self.touch(account)
+            self.stale(account, written[0])
+            self._conn.executemany("UPDATE entries SET pnl = ?, revision = revision + 1 WHERE id = ?", updates)
+            self._conn.executemany("INSERT INTO entries (account, day, pnl, source) VALUES (?, ?, ?, ?)", inserts)
+        return (np.array(written, dtype=np.int32), np.array([totals[day] for day in written], dtype=np.float64), skipped)
+
+    def put_account(self, account, name, capital, leverage, target_percent):
+        """Create account ``account`` with these parameters, or overwrite them (a restore)."""
+        try:
+            self._conn.execute(
+                "INSERT INTO accounts (id, name, capital, leverage, target_percent) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET name = excluded.name, capital = excluded.capital, "
+                "leverage = excluded.leverage, target_percent = excluded.target_percent",
+                (int(account), name, float(capital), float(leverage), float(target_percent)),
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Another account is already named {name!r}") from None
+        self.touch(account)
+
+    def replace_entries(self, account, days, pnl):
+        """Swap all of an account's entries for ``days``/``pnl`` (a restore)."""
+        bulk = len(days) >= BULK_ROWS
+        if bulk:
+            for name in BULK_INDEXES:
+                self._conn.execute(f"DROP INDEX IF EXISTS {name}")
+        self._conn.execute("DELETE FROM entries WHERE account = ?", (int(account),))
+        self._conn.execute("DELETE FROM month_rollups WHERE account = ?", (int(account),))
+        written = self.add_entries(days, pnl, account)
+        if bulk:
+            for name, columns in BULK_INDEXES.items():
+                self._conn.execute(f"CREATE INDEX {name} ON {columns}")
+        return written
+
+    def new_fills(self, fills, account=DEFAULT_ACCOUNT):
+        """The rows of ``fills`` the account does not hold yet.
+
+        A row with a ``trade_id`` is new unless that id is stored or came
+        earlier in ``fills``; one without is new unless a stored fill has its
+        ``FILL_KEY``. Rows that are merely equal in value are all kept.
+        """
+        if fills.empty:
+            return fills
+        account = int(account)
+        trade_ids = fills["trade_id"].to_numpy()
+        with_id = trade_ids != ""
+        keep = ~with_id
+        if with_id.any():
+            ids = list(set(trade_ids[with_id].tolist()))
+            stored = set()
+            for i in range(0, len(ids), LOOKUP_BATCH):
+                batch = ids[i:i + LOOKUP_BATCH]
+                stored.update(row[0] for row in self._conn.execute(
+                    f"SELECT trade_id FROM fills WHERE account = ? AND trade_id IN ({', '.join('?' * len(batch))})",
+                    [account] + batch))
+            keep = keep | (with_id & ~fills["trade_id"].duplicated().to_numpy() & ~np.isin(trade_ids, list(stored)))
+        if not with_id.all():
+            stored = set(self._conn.execute(
+                f"SELECT {', '.join(FILL_KEY)} FROM fills WHERE account = ? AND day BETWEEN ? AND ? AND trade_id = ''",
+                (account, int(fills["day"].min()), int(fills["day"].max()))))
+            if stored:
+                keys = fills.loc[:, list(FILL_KEY)].itertuples(index=False, name=None)
+                keep &= with_id | np.array([key not in stored for key in keys], dtype=bool)
+        return fills[keep]
+
+    def positions(self, symbols, account=DEFAULT_ACCOUNT):
+        """Stored ``symbol -> (qty, cost, ts)`` for those of ``symbols`` the account has filled; cost may be None."""
+        symbols, found = list(symbols), {}
+        for i in range(0, len(symbols), LOOKUP_BATCH):
+            batch = symbols[i:i + LOOKUP_BATCH]
+            for symbol, qty, cost, ts in self._conn.execute(
+                    f"SELECT symbol, qty, cost, ts FROM positions WHERE account = ? AND symbol IN ({', '.join('?' * len(batch))})",
+                    [int(account)] + batch):
+                found[symbol] = (qty, cost, ts)
+        return found
+
+    def put_positions(self, positions, account=DEFAULT_ACCOUNT):
+        """Store ``(symbol, qty, cost, ts)`` rows as the account's current positions."""
+        rows = ((int(account), symbol, qty, cost, ts) for symbol, qty, cost, ts in positions)
+        self._conn.executemany("INSERT OR REPLACE INTO positions (account, symbol, qty, cost, ts) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def symbol_fills(self, symbols, account=DEFAULT_ACCOUNT):
+        """The account's stored fills in ``symbols`` (ts, symbol, qty, price, fees), oldest first."""
+        import pandas as pd
+        symbols = list(symbols)
+        rows = self._conn.execute(
+            f"SELECT ts, symbol, qty, price, fees FROM fills WHERE account = ? AND symbol IN ({', '.join('?' * len(symbols))}) "
+            "ORDER BY ts, id", [int(account)] + symbols).fetchall()
+        return pd.DataFrame(rows, columns=["ts", "symbol", "qty", "price", "fees"])
+
+    def add_fills(self, fills, account=DEFAULT_ACCOUNT):
+        """Insert a DataFrame holding every column in ``FILL_COLUMNS``; fills already stored are ignored."""
+        if fills.empty:
+            return 0
+        self.touch(account)
+        columns = ("account",) + FILL_COLUMNS
+        # Column lists, not itertuples: iterating Arrow-backed string columns row by row is slow.
+        rows = zip([int(account)] * len(fills), *(fills[column].tolist() for column in FILL_COLUMNS))
+        sql = f"INSERT OR IGNORE INTO fills ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        return self._conn.executemany(sql, rows).rowcount
+
+
+# ----------------------------
+# HELPERS
+# ----------------------------
+def _connect(path):
+    # Autocommit mode: transactions are opened explicitly (BEGIN IMMEDIATE
+    # for writes) instead of implicitly before the first DML statement.
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def _revision(conn, account):
+    row = conn.execute("SELECT revision FROM accounts WHERE id = ?", (int(account),)).fetchone()
+    return row[0] if row else 0
+
+
+def _load_arrays(conn, start, stop, account):
+    where, params = _day_filter(start, stop, account)
+    rows = conn.execute(f"SELECT day, pnl FROM entries{where} ORDER BY day, id", params).fetchall()
+    if not rows:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+    days, pnl = zip(*rows)
+    return np.array(days, dtype=np.int32), np.array(pnl, dtype=np.float64)
+
+
+def _day(value):
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return to_day(value)
+
+
+def _day_filter(start, stop, account=None):
+    clauses, params = [], []
+    if account is not None:
+        clauses.append("account = ?")
+        params.append(int(account))
+    if start is not None:
+        clauses.append("day >= ?")
+        params.append(_day(start))
+    if stop is not None:
+        clauses.append("day < ?")
+        params.append(_day(stop))
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params
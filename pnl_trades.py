@@ -0,0 +1,271 @@
+import numpy as np
+import pandas as pd
+
+from pnl_dates import days_to_months, month_label
+from pnl_import import CHUNK_ROWS, ImportResult, _find_column, read_chunks
+from pnl_store import DEFAULT_ACCOUNT
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+TS_ALIASES = ("timestamp", "time", "trade time", "order execution time", "datetime", "trade date", "date")
+SYMBOL_ALIASES = ("symbol", "tradingsymbol", "scrip", "instrument", "ticker")
+QTY_ALIASES = ("qty", "quantity", "filled qty", "traded qty")
+PRICE_ALIASES = ("price", "trade price", "fill price", "avg price", "average price")
+FEES_ALIASES = ("fees", "charges", "brokerage", "commission")
+STRATEGY_ALIASES = ("strategy", "book", "tag")
+SIDE_ALIASES = ("side", "buy/sell", "trade type", "transaction type")
+TRADE_ID_ALIASES = ("trade id", "trade_id", "tradeid", "trade no", "trade no.", "fill id", "execution id", "exec id")
+
+SELL_SIDES = ("s", "sell", "sld", "short")
+# Positions smaller than this after a fill count as flat (float residue).
+FLAT_QTY = 1e-9
+
+
+# ----------------------------
+# PARSING
+# ----------------------------
+def _optional_column(columns, aliases):
+    try:
+        return _find_column(columns, aliases)
+    except ValueError:
+        return None
+
+
+def _numeric(series):
+    if not pd.api.types.is_numeric_dtype(series):
+        series = series.astype(str).str.replace(r"[,₹\s]", "", regex=True)
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class PositionBook:
+    """Open positions per symbol at average cost, realising fills in time order.
+
+    A fill that opens or adds to a position realises nothing and moves the
+    average cost; one that reduces it realises ``closed qty * (price - cost)``
+    on the closed quantity, and one that flips the side reopens the rest at
+    its own price. Fees are charged on every fill. Positions carry across
+    days, so a swing trade books its P&L on the day it is closed rather than
+    its notional on the day it is opened.
+    """
+
+    __slots__ = ("_open",)
+
+    def __init__(self):
+        # Symbol -> [signed qty, average cost, last fill ts].
+        self._open = {}
+
+    def __contains__(self, symbol):
+        return symbol in self._open
+
+    def open(self, symbol, qty, cost, ts):
+        """Start ``symbol`` from a stored position whose last fill was at ``ts``."""
+        self._open[symbol] = [float(qty), float(cost), int(ts)]
+
+    def positions(self):
+        """``(symbol, qty, cost, last ts)`` for every symbol in the book."""
+        return [(symbol, held, cost, ts) for symbol, (held, cost, ts) in self._open.items()]
+
+    def position(self, symbol):
+        """``(qty, average cost)`` held in ``symbol``."""
+        held, cost, _ = self._open.get(symbol, (0.0, 0.0, None))
+        return held, cost
+
+    def realise(self, fills):
+        """Realised P&L net of fees of each fill, in ``fills`` order.
+
+        ``fills`` are applied by timestamp; a fill older than the last one
+        the book holds for its symbol raises ``ValueError``.
+        """
+        order = np.argsort(fills["ts"].to_numpy(), kind="stable")
+        columns = [fills[c].to_numpy()[order].tolist() for c in ("ts", "symbol", "qty", "price", "fees")]
+        pnl = np.empty(len(order), dtype=np.float64)
+        for i, ts, symbol, qty, price, fees in zip(order.tolist(), *columns):
+            state = self._open.get(symbol)
+            if state is None:
+                state = self._open[symbol] = [0.0, 0.0, ts]
+            elif ts < state[2]:
+                raise ValueError(f"{symbol} fill at {pd.Timestamp(ts)} is older than fills already booked; "
+                                 "import fills in time order")
+            held, cost = state[0], state[1]
+            realised = 0.0
+            if held * qty < 0:
+                closed = min(abs(qty), abs(held))
+                realised = closed * (price - cost) if held > 0 else closed * (cost - price)
+                held += qty
+                if abs(held) < FLAT_QTY:
+                    held, cost = 0.0, 0.0
+                elif held * qty > 0:
+                    cost = price
+            elif held + qty:
+                held, cost = held + qty, (held * cost + qty * price) / (held + qty)
+            state[0], state[1], state[2] = held, cost, ts
+            pnl[i] = realised - fees
+        return pnl
+
+
+def parse_fills(chunk, dayfirst=False):
+    """Validate one chunk into a DataFrame with ``FILL_COLUMNS`` and a reject count.
+
+    ``pnl`` is left NaN: it depends on the position, so ``PositionBook`` fills it in.
+    ``trade_id`` is ``""`` when the export has none, and ``seq`` is 0 until
+    ``FillNumbering`` numbers the rows.
+    """
+    columns = chunk.columns
+    ts = pd.to_datetime(chunk[_find_column(columns, TS_ALIASES)], errors="coerce", dayfirst=dayfirst)
+    symbol = chunk[_find_column(columns, SYMBOL_ALIASES)].fillna("").astype(str).str.strip().str.upper()
+    qty = _numeric(chunk[_find_column(columns, QTY_ALIASES)])
+    price = _numeric(chunk[_find_column(columns, PRICE_ALIASES)])
+
+    fees_col = _optional_column(columns, FEES_ALIASES)
+    fees = np.nan_to_num(_numeric(chunk[fees_col])) if fees_col is not None else np.zeros(len(chunk))
+    strategy_col = _optional_column(columns, STRATEGY_ALIASES)
+    strategy = chunk[strategy_col].fillna("").astype(str).str.strip() if strategy_col is not None else ""
+    trade_id_col = _optional_column(columns, TRADE_ID_ALIASES)
+    trade_id = _ids(chunk[trade_id_col]) if trade_id_col is not None else np.full(len(chunk), "", dtype=object)
+    side_col = _optional_column(columns, SIDE_ALIASES)
+    if side_col is not None:
+        sells = chunk[side_col].astype(str).str.strip().str.lower().isin(SELL_SIDES).to_numpy()
+        qty = np.where(sells, -np.abs(qty), np.abs(qty))
+
+    valid = ts.notna().to_numpy() & np.isfinite(qty) & np.isfinite(price) & (symbol != "").to_numpy()
+    stamps = ts[valid].to_numpy().astype("datetime64[ns]")
+    fills = pd.DataFrame({
+        "ts": stamps.astype(np.int64),
+        "day": stamps.astype("datetime64[D]").astype(np.int32),
+        "symbol": symbol[valid].to_numpy(),
+        "strategy": strategy[valid].to_numpy() if strategy_col is not None else "",
+        "qty": qty[valid],
+        "price": price[valid],
+        "fees": fees[valid],
+    })
+    fills["pnl"] = np.nan
+    fills["trade_id"] = trade_id[valid]
+    fills["seq"] = 0
+    return fills, int((~valid).sum())
+
+
+def _ids(series):
+    if pd.api.types.is_float_dtype(series):
+        # A numeric id column with blanks is read as float; 123.0 -> "123".
+        series = series.astype("Int64")
+    return series.astype("string").fillna("").str.strip().to_numpy(dtype=object)
+
+
+class FillNumbering:
+    """Numbers each fill without a trade id among identical earlier rows of one file.
+
+    Two partial fills of the same size at the same price in the same second
+    are distinct fills; ``seq`` (0, 1, ...) keeps them apart, while the same
+    rows in a re-imported or overlapping export get the same numbers and are
+    recognised as stored. Counts are kept per value hash across chunks.
+    """
+
+    __slots__ = ("_seen",)
+
+    def __init__(self):
+        self._seen = pd.Series(dtype=np.int64)
+
+    def number(self, fills):
+        """``fills`` with ``seq`` set on the rows that have no ``trade_id``."""
+        anonymous = (fills["trade_id"] == "").to_numpy()
+        if not anonymous.any():
+            return fills
+        keys = pd.Series(pd.util.hash_pandas_object(fills.loc[anonymous, ["ts", "symbol", "qty", "price"]], index=False).to_numpy())
+        earlier = self._seen.reindex(keys.to_numpy()).fillna(0).to_numpy(dtype=np.int64)
+        seq = np.zeros(len(fills), dtype=np.int64)
+        seq[anonymous] = keys.groupby(keys).cumcount().to_numpy() + earlier
+        self._seen = self._seen.add(keys.value_counts(), fill_value=0).astype(np.int64)
+        return fills.assign(seq=seq)
+
+
+# ----------------------------
+# ROLL-UPS
+# ----------------------------
+def rollup(fills, by):
+    """Group-reduce fills to ``pnl``, ``fees`` and ``fills`` per key.
+
+    ``by`` is any fills column, or ``"month"`` which is derived from ``day``.
+    Uses factorize + bincount, so it is a single vectorised pass.
+    """
+    keys = days_to_months(fills["day"].to_numpy()) if by == "month" else fills[by].to_numpy()
+    codes, uniques = pd.factorize(keys, sort=True)
+    size = len(uniques)
+    out = pd.DataFrame({
+        by: uniques,
+        "pnl": np.bincount(codes, weights=fills["pnl"].to_numpy(), minlength=size),
+        "fees": np.bincount(codes, weights=fills["fees"].to_numpy(), minlength=size),
+        "fills": np.bincount(codes, minlength=size),
+    })
+    if by == "month":
+        out["month"] = [month_label(m) for m in out["month"]]
+    return out
+
+
+def range_rollups(store, start, stop, account=DEFAULT_ACCOUNT):
+    """Symbol and strategy roll-ups for an account's fills in ``[start, stop)``, or None."""
+    fills = store.load_fills(start, stop, columns=("day", "symbol", "strategy", "fees", "pnl"), account=account)
+    if fills.empty:
+        return None
+    return {"symbol": rollup(fills, "symbol"), "strategy": rollup(fills, "strategy")}
+
+
+# ----------------------------
+# IMPORT
+# ----------------------------
+def import_fills(store, source, name, dayfirst=False, skip_existing=True, chunk_rows=CHUNK_ROWS, progress=None,
+                 account=DEFAULT_ACCOUNT):
+    """Stream a fills export into the store and roll it up to daily entries.
+
+    Fills are written chunk by chunk while the days they touch are
+    collected; the daily roll-up lands in ``entries`` inside the same
+    transaction, so every existing panel sees the new days without touching
+    the fills. Fills the account already holds (by trade id, or by value and
+    ``seq`` when the export has no ids) count as ``duplicates`` and are left
+    out, so re-importing an overlapping export only adds what is new.
+
+    Each day that gained fills has its fills entry set to the total of all
+    its stored fills, so a midday and an end-of-day import of the same day
+    add up. ``skip_existing`` only concerns other entries: a day that
+    has typed-in or history-imported P&L and no fills entry is left alone
+    (``skipped_existing``), as the history import leaves such days.
+
+    Each fill's P&L is realised against the symbol's position, read from
+    the stored positions the first time the symbol appears (and written
+    back at the end), so the cost does not grow with the account's history;
+    fills must be newer than those already stored for their symbol.
+    """
+    result = ImportResult()
+    book = PositionBook()
+    numbering = FillNumbering()
+    total_bytes = getattr(source, "size", None)
+    days = np.empty(0, dtype=np.int32)
+    with store.batch() as batch:
+        for chunk in read_chunks(source, name, chunk_rows):
+            fills, rejected = parse_fills(chunk, dayfirst=dayfirst)
+            fills = numbering.number(fills)
+            result.rows_read += len(chunk)
+            result.rows_rejected += rejected
+            fills_new = batch.new_fills(fills, account)
+            result.duplicates += len(fills) - len(fills_new)
+            unseen = [symbol for symbol in fills_new["symbol"].unique() if symbol not in book]
+            if unseen:
+                replay = []
+                for symbol, (qty, cost, ts) in batch.positions(unseen, account).items():
+                    if cost is None:
+                        replay.append(symbol)
+                    else:
+                        book.open(symbol, qty, cost, ts)
+                if replay:
+                    book.realise(batch.symbol_fills(replay, account))
+            fills_new = fills_new.assign(pnl=book.realise(fills_new))
+            result.fills += batch.add_fills(fills_new, account)
+            days = np.union1d(days, fills_new["day"].to_numpy())
+            if progress is not None and total_bytes and hasattr(source, "tell"):
+                progress(min(1.0, source.tell() / total_bytes))
+        batch.put_positions(book.positions(), account)
+        result.days, result.pnl, result.skipped_existing = batch.put_fill_entries(days, skip_existing, account)
+        result.inserted = len(result.days)
+    if progress is not None:
+        progress(1.0)
+    return result